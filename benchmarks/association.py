@@ -0,0 +1,52 @@
+"""
+Benchmark dense vs grid indexed track - detection association
+
+    python -m benchmarks.association
+"""
+import time
+import numpy as np
+from utils.association import associate, associate_grid
+from utils.spatial import GridIndex
+
+
+W, H = (1920, 1080)
+MAX_DISTANCE = 40
+REPEATS = 20
+
+
+def scene(n, rng):
+
+    """
+    n tracked boxes spread over the frame and their detections
+    moved a few pixels, in shuffled order
+    :return: tracked boxes, detected boxes
+    """
+
+    centers = rng.uniform((0, 0), (W, H), (n, 2))
+    size = np.array([20, 45])
+    tracked = np.hstack([centers - size, centers + size])
+    moved = centers + rng.normal(0, 5, (n, 2))
+    detected = np.hstack([moved - size, moved + size])[rng.permutation(n)]
+
+    return tracked, detected
+
+
+def timed(function, *args):
+    start = time.perf_counter()
+    for _ in range(REPEATS):
+        result = function(*args)
+    return result, 1000 * (time.perf_counter() - start) / REPEATS
+
+
+if __name__ == '__main__':
+
+    rng = np.random.RandomState(0)
+    grid = GridIndex(W, H, MAX_DISTANCE)
+
+    print("{:>6} {:>12} {:>12} {:>10}".format("objects", "dense ms", "grid ms", "same"))
+    for n in (50, 200, 1000):
+        tracked, detected = scene(n, rng)
+        (dense_rows, dense_cols), dense_ms = timed(associate, tracked, detected, MAX_DISTANCE)
+        (grid_rows, grid_cols), grid_ms = timed(associate_grid, tracked, detected, grid)
+        same = set(zip(dense_rows, dense_cols)) == set(zip(grid_rows, grid_cols))
+        print("{:>6} {:>12.2f} {:>12.2f} {:>10}".format(n, dense_ms, grid_ms, str(same)))
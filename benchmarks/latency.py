@@ -0,0 +1,81 @@
+"""
+Checks end to end alert latency on a replayed scene
+
+Replays a synthetic crossing at `--fps` through the main loop stages
+(detections, ZoneTracker, RiskEngine, AlertController, ActuatorBank
+on a loopback output taking `--write-delay` seconds per write) with
+capture timestamps, prints the p50 / p95 / p99 of every latency stage
+and fails if a stage goes over `--budget` milliseconds:
+
+    python -m benchmarks.latency --fps 30 --budget 100
+"""
+import argparse
+import sys
+import time
+import numpy as np
+from detectors import postprocess
+from detectors.synthetic import SyntheticDetector, Trajectory
+from trackers.zonetracker import ZoneTracker
+from utils.actuators import ActuatorBank, LoopbackDriver
+from utils.alerts import AlertController
+from utils.latency import LatencyMonitor, Origin
+from utils.risk import RiskEngine
+from utils.zones import ZoneMask
+
+
+WIDTH, HEIGHT = 800, 480
+
+
+def crossing_zones():
+    # waiting zone on the top half, pedestrians walk down to the crossing
+    mask = np.zeros((HEIGHT, WIDTH), dtype=np.uint8)
+    mask[:HEIGHT // 2] = 1
+    return ZoneMask(['waiting'], mask)
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--fps', type=float, default=30)
+    parser.add_argument('--crossings', type=int, default=20)
+    parser.add_argument('--write-delay', type=float, default=0.005, help='seconds every output write takes')
+    parser.add_argument('--budget', type=float, default=100, help='allowed p95 of the alert stage in milliseconds')
+    args = parser.parse_args()
+
+    period = 1 / args.fps
+    # one pedestrian walking down to the crossing every 2 s, each one visible 1 s
+    frames_per_crossing = int(2 * args.fps)
+    trajectories = [
+        Trajectory(1, (WIDTH / 2, 60), (0, 150 / args.fps), (40, 90), idx * frames_per_crossing, idx * frames_per_crossing + int(args.fps))
+        for idx in range(args.crossings)
+    ]
+    detector = SyntheticDetector(trajectories)
+
+    zones = crossing_zones()
+    tracker = ZoneTracker(zones, maxDistance=120, maxAge=0.5)
+    engine = RiskEngine(zones, {'waiting': 'down'}, horizon=3.0)
+    latency = LatencyMonitor('benchmark')
+    actuators = ActuatorBank([LoopbackDriver(delay=args.write_delay)], listener=latency.ack)
+    alerts = AlertController(lambda: actuators.on(alerts.origin), actuators.off, 0.5, 0.25, 0.2)
+
+    for frame in range(args.crossings * frames_per_crossing):
+        capture = time.monotonic()
+        detections = postprocess.detections_to_array(detector.detect(None))
+        tracker.update(detections, capture)
+        # a vehicle always standing on the road
+        risk = engine.assess(tracker, None, True)
+        alerts.update(risk.score, Origin(capture, tracker.first_seen_of(risk.pedestrian)))
+        latency.decision(capture)
+        time.sleep(max(0.0, period - (time.monotonic() - capture)))
+
+    alerts.close()
+    actuators.close()
+
+    print(latency.report())
+    print("alerts: {}".format(alerts.switches))
+    try:
+        latency.check_budget({'alert': args.budget / 1000})
+    except Exception as error:
+        print("FAIL: {}".format(error))
+        sys.exit(1)
+    print("OK: alert latency within budget")
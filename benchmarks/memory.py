@@ -0,0 +1,91 @@
+"""
+Checks that steady state tracking does not grow memory
+
+Runs the trackers of main.py (ZoneTracker for the crosswalk and
+ArrayTracker for the road, both on capture timestamps with re-ID on)
+over a synthetic scene covering `--hours` of operation at `--fps`
+and fails if traced memory keeps growing after warm up:
+
+    python -m benchmarks.memory --hours 1 --fps 10
+"""
+import argparse
+import sys
+import tracemalloc
+import numpy as np
+from detectors import postprocess
+from detectors.synthetic import SyntheticDetector, crossing_scenario
+from trackers.arraytracker import ArrayTracker
+from trackers.reid import ReIDCache
+from trackers.zonetracker import ZoneTracker
+from utils.zones import ZoneMask
+
+
+WIDTH, HEIGHT = 800, 480
+
+# scene repeated over and over, objects keep entering and leaving
+SCENE_FRAMES = 3000
+
+
+def crosswalk_zones():
+    # waiting zones on the top and bottom thirds, crossing in between
+    mask = np.zeros((HEIGHT, WIDTH), dtype=np.uint8)
+    mask[:HEIGHT // 3] = 1
+    mask[2 * HEIGHT // 3:] = 2
+    mask[HEIGHT // 3:2 * HEIGHT // 3] = 4
+    return ZoneMask(['crossContourUp', 'crossContourDown', 'crossing'], mask)
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--hours', type=float, default=1)
+    parser.add_argument('--fps', type=float, default=10)
+    parser.add_argument('--samples', type=int, default=10)
+    parser.add_argument('--tolerance', type=int, default=64 * 1024, help='allowed growth in bytes')
+    args = parser.parse_args()
+
+    frames = int(args.hours * 3600 * args.fps)
+    detector = SyntheticDetector(crossing_scenario(WIDTH, HEIGHT, SCENE_FRAMES, people=20, cars=10))
+    pedestrian_table = postprocess.class_table(['person'])
+    vehicle_table = postprocess.class_table(['car', 'motorcycle', 'bus', 'truck'])
+    ped_tracker = ZoneTracker(crosswalk_zones(), maxDistance=120, maxAge=0.5, reid=ReIDCache())
+    veh_tracker = ArrayTracker(maxDistance=120, maxAge=0.5, reid=ReIDCache())
+    # textured frame so re-ID descriptors are not all alike
+    image = np.random.RandomState(0).randint(0, 256, (HEIGHT, WIDTH, 3), dtype=np.uint8)
+
+    frame_idx = 0
+
+    def step():
+        global frame_idx
+        # restart the scene when it ends, time keeps running
+        if detector.frame_idx > SCENE_FRAMES:
+            detector.frame_idx = 0
+        timestamp = frame_idx / args.fps
+        frame_idx += 1
+        detections = postprocess.detections_to_array(detector.detect(None))
+        ped_tracker.update(detections[postprocess.filter_classes(detections, pedestrian_table)], timestamp, image)
+        veh_tracker.update(detections[postprocess.filter_classes(detections, vehicle_table)], timestamp, image)
+
+    # warm up: slots, re-ID caches and interpreter caches reach their size
+    for _ in range(2 * SCENE_FRAMES):
+        step()
+
+    tracemalloc.start()
+    usage = []
+    every = max(1, frames // args.samples)
+    for frame in range(frames):
+        step()
+        if frame % every == 0:
+            usage.append(tracemalloc.get_traced_memory()[0])
+    tracemalloc.stop()
+
+    growth = usage[-1] - usage[0]
+    print("frames: {} traced memory (KiB): {}".format(frames, [round(u / 1024, 1) for u in usage]))
+    print("growth: {} bytes, slots: {} + {}, lost tracks kept: {} + {}".format(
+        growth, ped_tracker.capacity, veh_tracker.capacity, len(ped_tracker.reid), len(veh_tracker.reid)
+    ))
+
+    if growth > args.tolerance:
+        print("FAIL: memory grows over time")
+        sys.exit(1)
+    print("OK: memory flat")
@@ -0,0 +1,84 @@
+"""
+Benchmark presence-only road analysis against the full detector path
+
+Runs both over a road video and prints agreement and cost per frame:
+
+    python -m benchmarks.presence video/car_uma_01.webm --method motion
+    python -m benchmarks.presence video/car_uma_01.webm --method lowres --lowres-size 150
+"""
+import argparse
+import cv2
+from utils import contour, classes, zones
+from utils.presence import RoadPresence, PresenceAgreement, timed
+from detectors import postprocess
+from detectors.opencvdnn import OpenCVDetector
+from trackers.arraytracker import ArrayTracker
+
+
+VEHICLE_CLASSES = ["car", "motorcycle", "bus", "truck"]
+# baseline expiry of missing tracks, in frames
+TRACK_MAX_FRAMES = 15
+
+
+def full_path(net, tracker, frame, timestamp, roadZones, roi, vehicle_table):
+
+    """
+    Same road analysis done by main.py: detection, class and zone filters and tracking
+    :return: bool, True if any vehicle inside roadContour
+    """
+
+    detections, = net.detect_in_rois([frame], ['road'], [roi])
+    vehArray = postprocess.detections_to_array(detections)
+    in_road = postprocess.filter_classes(vehArray, vehicle_table)
+    in_road &= roadZones.in_zone(vehArray['center'], 'roadContour')
+    tracker.update(vehArray[in_road], timestamp)
+
+    return bool(in_road.any())
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument('video')
+    parser.add_argument('--contour', default='roadContour')
+    parser.add_argument('--method', default='motion', choices=['motion', 'lowres'])
+    parser.add_argument('--model', default="models/ssd_mobilenet_v2_coco/frozen_inference_graph.pb")
+    parser.add_argument('--config', default="models/ssd_mobilenet_v2_coco/ssd_mobilenet_v2_coco.pbtxt")
+    parser.add_argument('--threshold', type=float, default=0.7)
+    parser.add_argument('--lowres-size', type=int, default=150)
+    parser.add_argument('--occupancy', type=float, default=0.02)
+    args = parser.parse_args()
+
+    cam = cv2.VideoCapture(args.video)
+    W = int(cam.get(cv2.CAP_PROP_FRAME_WIDTH))
+    H = int(cam.get(cv2.CAP_PROP_FRAME_HEIGHT))
+    fps = cam.get(cv2.CAP_PROP_FPS) or 25
+    roadContour = contour.load_contour(args.contour)
+    roi = contour.get_contours_roi([roadContour], W, H)
+    roadZones = zones.ZoneMask.from_contours(['roadContour'], [roadContour], W, H)
+
+    net = OpenCVDetector(args.model, args.config, args.threshold)
+    vehicle_table = postprocess.class_table(VEHICLE_CLASSES)
+    tracker = ArrayTracker(maxDistance=120, maxAge=TRACK_MAX_FRAMES / fps)
+
+    lowres_net = None
+    if args.method == 'lowres':
+        size = (args.lowres_size, args.lowres_size)
+        lowres_net = OpenCVDetector(args.model, args.config, args.threshold, size)
+    vehicle_ids = [classes.classesDict.index(name) for name in VEHICLE_CLASSES]
+    presence = RoadPresence(roadContour, W, H, args.method, lowres_net, vehicle_ids, args.occupancy, roi)
+
+    agreement = PresenceAgreement()
+    frame_idx = 0
+    while True:
+        ok, frame = cam.read()
+        if not ok:
+            break
+        # video time, so tracks expire as they would at the recorded frame rate
+        timestamp = frame_idx / fps
+        frame_idx += 1
+        reference, reference_time = timed(full_path, net, tracker, frame, timestamp, roadZones, roi, vehicle_table)
+        estimate, estimate_time = timed(presence.update, frame)
+        agreement.update(estimate, reference, estimate_time, reference_time)
+
+    print(args.method, agreement.summary())
@@ -0,0 +1,40 @@
+class Detection:
+
+        """
+        Uniform detection record returned by every detector backend
+        Attribute names follow jetson.inference detectNet.Detection
+        so BBox and the rest of the pipeline work with any backend
+        """
+
+        __slots__ = ('ClassID', 'Confidence', 'Left', 'Top', 'Right', 'Bottom', 'Center', 'source')
+
+        def __init__(self, class_id, confidence, left, top, right, bottom, source=None):
+
+                self.ClassID = int(class_id)
+                self.Confidence = float(confidence)
+                self.Left = float(left)
+                self.Top = float(top)
+                self.Right = float(right)
+                self.Bottom = float(bottom)
+                self.Center = ((self.Left + self.Right) / 2, (self.Top + self.Bottom) / 2)
+                # stream the detection comes from, e.g. 'crosswalk' or 'road'
+                self.source = source
+
+        def offset(self, dx, dy):
+
+                """
+                Moves the detection, e.g. from crop to full frame coordinates
+                :param dx: x offset in pixels
+                :param dy: y offset in pixels
+                """
+
+                self.Left += dx
+                self.Right += dx
+                self.Top += dy
+                self.Bottom += dy
+                self.Center = (self.Center[0] + dx, self.Center[1] + dy)
+
+        def __repr__(self):
+                return 'Detection(class={}, conf={:.2f}, ltrb=({:.0f}, {:.0f}, {:.0f}, {:.0f}))'.format(
+                        self.ClassID, self.Confidence, self.Left, self.Top, self.Right, self.Bottom
+                )
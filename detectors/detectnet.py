@@ -0,0 +1,47 @@
+import jetson.inference
+import jetson.utils
+from detectors.detector import Detector
+from detectors.detection import Detection
+
+
+class DetectNetDetector(Detector):
+
+        """
+        jetson.inference detectNet backend (Jetson / CUDA)
+        detectNet has no batch API: detect_batch runs one Detect per frame
+        """
+
+        input_format = 'cuda'
+
+        def __init__(self, arch, argv, threshold, width, height, overlay='none'):
+
+                self.net = jetson.inference.detectNet(arch, argv, threshold)
+                self.width = width
+                self.height = height
+                self.overlay = overlay
+                # preallocated crop buffers by (source, width, height):
+                # crops of one batch must not share a buffer
+                self.crops = {}
+
+        def crop(self, frame, roi, source=None):
+
+                x, y, w, h = roi
+                key = (source, w, h)
+                if key not in self.crops:
+                        self.crops[key] = jetson.utils.cudaAllocMapped(width=w, height=h, format=frame.format)
+                crop = self.crops[key]
+                jetson.utils.cudaCrop(frame, crop, (x, y, x + w, y + h))
+
+                return crop
+
+        def detect(self, frame):
+
+                # crops are smaller than the camera frame
+                width = getattr(frame, 'width', self.width)
+                height = getattr(frame, 'height', self.height)
+                detections = self.net.Detect(frame, width, height, self.overlay)
+
+                return [
+                        Detection(d.ClassID, d.Confidence, d.Left, d.Top, d.Right, d.Bottom)
+                        for d in detections
+                ]
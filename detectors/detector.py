@@ -0,0 +1,84 @@
+class Detector:
+
+        """
+        Detector backend interface
+        Every backend takes a frame in its input format
+        and returns a list of detectors.detection.Detection
+        """
+
+        # 'bgr' for numpy cv2 frames, 'cuda' for Cuda Mallocs
+        input_format = 'bgr'
+
+        def detect(self, frame):
+
+                """
+                Runs detection over one frame
+                :param frame: numpy array or cuda image, depending on input_format
+                :return: list of Detection
+                """
+
+                raise NotImplementedError
+
+        def detect_batch(self, frames, sources):
+
+                """
+                Runs detection over N frames (both cameras or several crossings)
+                Backends able to batch run them in a single call,
+                the default falls back to one call per frame
+                :param frames: list of frames, depending on input_format
+                :param sources: list of str, stream name of each frame
+                :return: list with a list of Detection per frame, tagged with its source
+                """
+
+                results = []
+                for frame, source in zip(frames, sources):
+                        detections = self.detect(frame)
+                        for detection in detections:
+                                detection.source = source
+                        results.append(detections)
+
+                return results
+
+        def crop(self, frame, roi, source=None):
+
+                """
+                Crops a frame to a region of interest (view, no copy)
+                :param frame: numpy array
+                :param roi: tuple (x, y, w, h)
+                :param source: str, stream name of the frame
+                :return: cropped frame
+                """
+
+                x, y, w, h = roi
+                return frame[y:y + h, x:x + w]
+
+        def detect_in_rois(self, frames, sources, rois):
+
+                """
+                Runs detect_batch only over the regions of interest of each frame
+                and maps detections back to full frame coordinates
+                :param frames: list of frames, None frames are skipped (no detections)
+                :param sources: list of str, stream name of each frame
+                :param rois: list of tuples (x, y, w, h), None to use the whole frame
+                :return: list with a list of Detection per frame
+                """
+
+                results = [[] for _ in frames]
+                active = [idx for idx, frame in enumerate(frames) if frame is not None]
+                if not active:
+                        return results
+
+                crops = [
+                        frames[idx] if rois[idx] is None else self.crop(frames[idx], rois[idx], sources[idx])
+                        for idx in active
+                ]
+                detections_batch = self.detect_batch(crops, [sources[idx] for idx in active])
+
+                for idx, detections in zip(active, detections_batch):
+                        results[idx] = detections
+                        if rois[idx] is None:
+                                continue
+                        for detection in detections:
+                                detection.offset(rois[idx][0], rois[idx][1])
+
+                return results
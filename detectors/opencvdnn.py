@@ -0,0 +1,56 @@
+import cv2
+from os import path
+from detectors.detector import Detector
+from detectors.detection import Detection
+
+
+class OpenCVDetector(Detector):
+
+        """
+        CPU backend based on cv2.dnn
+        Loads a local SSD-MobileNet Tensorflow model, e.g.
+        frozen_inference_graph.pb + ssd_mobilenet_v2_coco.pbtxt
+        COCO class ids match utils.classes.classesDict
+        """
+
+        input_format = 'bgr'
+
+        def __init__(self, model_path, config_path, threshold=0.5, size=(300, 300)):
+
+                for file_path in (model_path, config_path):
+                        if not path.isfile(file_path):
+                                raise Exception("No existe el modelo {}".format(file_path))
+
+                self.net = cv2.dnn.readNetFromTensorflow(model_path, config_path)
+                self.net.setPreferableBackend(cv2.dnn.DNN_BACKEND_OPENCV)
+                self.net.setPreferableTarget(cv2.dnn.DNN_TARGET_CPU)
+                self.threshold = threshold
+                self.size = size
+
+        def detect(self, frame):
+
+                return self.detect_batch([frame], [None])[0]
+
+        def detect_batch(self, frames, sources):
+
+                # every frame is resized to the net input, so they stack in one blob
+                blob = cv2.dnn.blobFromImages(frames, size=self.size, swapRB=True)
+                self.net.setInput(blob)
+                # output shape: [1, 1, N, 7]
+                # [image id, class id, confidence, left, top, right, bottom] normalized
+                output = self.net.forward()
+
+                results = [[] for _ in frames]
+                for image_id, class_id, confidence, left, top, right, bottom in output[0, 0]:
+                        if confidence < self.threshold:
+                                continue
+                        # split results back to their stream
+                        image_id = int(image_id)
+                        height, width = frames[image_id].shape[:2]
+                        results[image_id].append(Detection(
+                                class_id, confidence,
+                                left * width, top * height, right * width, bottom * height,
+                                sources[image_id]
+                        ))
+
+                return results
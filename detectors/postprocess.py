@@ -0,0 +1,56 @@
+import numpy as np
+from utils import classes
+
+
+# One row per detection
+DETECTION_DTYPE = np.dtype([
+        ('class_id', np.int32),
+        ('ltrb', np.float32, 4),
+        ('center', np.float32, 2),
+        ('confidence', np.float32),
+])
+
+
+def detections_to_array(detections):
+
+        """
+        Converts the detections of one frame into a structured array
+        :param detections: list of Detection (or detectNet.Detection)
+        :return: numpy structured array of DETECTION_DTYPE
+        """
+
+        return np.array(
+                [
+                        (d.ClassID, (d.Left, d.Top, d.Right, d.Bottom), d.Center, d.Confidence)
+                        for d in detections
+                ],
+                dtype=DETECTION_DTYPE
+        )
+
+
+def class_table(names):
+
+        """
+        Boolean lookup table indexed by ClassID
+        :param names: list of str, class names to keep
+        :return: numpy bool array, True for the classes in names
+        """
+
+        return np.array([name in names for name in classes.classesDict], dtype=bool)
+
+
+def filter_classes(detections, table):
+
+        """
+        Vectorized class filter
+        :param detections: structured array of DETECTION_DTYPE
+        :param table: bool lookup table from class_table
+        :return: bool mask, True for detections of the classes in table
+        """
+
+        class_ids = detections['class_id']
+        known = (class_ids >= 0) & (class_ids < len(table))
+        mask = np.zeros(len(detections), dtype=bool)
+        mask[known] = table[class_ids[known]]
+
+        return mask
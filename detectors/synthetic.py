@@ -0,0 +1,171 @@
+from collections import namedtuple
+import numpy as np
+from detectors.detector import Detector
+from detectors.detection import Detection
+
+
+# Scripted object: class id, starting center (x, y), velocity (px/frame),
+# box size (w, h) and first / last frame where it is visible
+Trajectory = namedtuple('Trajectory', ['class_id', 'start', 'velocity', 'size', 'first_frame', 'last_frame'])
+
+
+def stamp_frame_index(frame, frame_idx):
+
+        """
+        Writes the index of a synthetic frame on its first bytes
+        :param frame: numpy array, contiguous
+        :param frame_idx: int
+        """
+
+        frame.reshape(-1)[:8] = np.frombuffer(np.int64(frame_idx).tobytes(), dtype=np.uint8)
+
+
+def read_frame_index(frame):
+
+        """
+        :param frame: numpy array stamped by stamp_frame_index
+        :return: int, frame index
+        """
+
+        return int(np.frombuffer(frame.reshape(-1)[:8].tobytes(), dtype=np.int64)[0])
+
+
+class SyntheticDetector(Detector):
+
+        """
+        Deterministic detector driven by scripted trajectories
+        Ignores the frame content, so the whole pipeline
+        (BBox, trackers, alerts) can be run and profiled without a net
+        Frames of a SyntheticCamera carry their index, so detections follow
+        the captured frames however many times a frame is detected or dropped;
+        without frames (None) every call moves on to the next frame
+        """
+
+        input_format = 'bgr'
+
+        def __init__(self, trajectories, confidence=0.9):
+
+                self.trajectories = trajectories
+                self.confidence = confidence
+                self.frame_idx = 0
+
+        def detect(self, frame):
+
+                return self.detect_batch([frame], [None])[0]
+
+        def detect_batch(self, frames, sources):
+
+                results = [
+                        self.scripted_detections(source, self.frame_idx if frame is None else read_frame_index(frame))
+                        for frame, source in zip(frames, sources)
+                ]
+                self.frame_idx += 1
+
+                return results
+
+        def detect_in_rois(self, frames, sources, rois):
+
+                # scripted trajectories are already in full frame coordinates
+                results = self.detect_batch(frames, sources)
+
+                return [detections if frame is not None else [] for frame, detections in zip(frames, results)]
+
+        def scripted_detections(self, source, frame_idx):
+
+                detections = []
+                for trajectory in self.trajectories:
+                        if not trajectory.first_frame <= frame_idx <= trajectory.last_frame:
+                                continue
+                        elapsed = frame_idx - trajectory.first_frame
+                        x = trajectory.start[0] + trajectory.velocity[0] * elapsed
+                        y = trajectory.start[1] + trajectory.velocity[1] * elapsed
+                        w, h = trajectory.size
+                        detections.append(Detection(
+                                trajectory.class_id, self.confidence,
+                                x - w / 2, y - h / 2, x + w / 2, y + h / 2,
+                                source
+                        ))
+
+                return detections
+
+
+class SyntheticCamera:
+
+        """
+        Mimics cv2 VideoCapture returning blank frames stamped with their index
+        To be used together with SyntheticDetector
+        """
+
+        def __init__(self, width=800, height=480, frames=None, fps=30):
+
+                """
+                :param frames: int, frames before running out, None never ends
+                :param fps: float, frame rate reported to capture workers to pace reading
+                """
+
+                self.frame = np.zeros((height, width, 3), dtype=np.uint8)
+                self.frames = frames
+                self.fps = fps
+                self.frame_idx = 0
+
+        def get(self, prop):
+                # 3: CAP_PROP_FRAME_WIDTH, 4: CAP_PROP_FRAME_HEIGHT, 5: CAP_PROP_FPS
+                if prop == 3:
+                        return self.frame.shape[1]
+                if prop == 4:
+                        return self.frame.shape[0]
+                if prop == 5:
+                        return self.fps
+                return 0
+
+        def grab(self):
+                self.frame_idx += 1
+                return self.frames is None or self.frame_idx <= self.frames
+
+        def retrieve(self):
+                frame = self.frame.copy()
+                stamp_frame_index(frame, self.frame_idx - 1)
+                return True, frame
+
+        def read(self):
+                if not self.grab():
+                        return False, None
+                return self.retrieve()
+
+        def release(self):
+                pass
+
+
+def crossing_scenario(width, height, frames=1000, people=4, cars=3, seed=0):
+
+        """
+        Builds a reproducible scene of pedestrians crossing
+        top to bottom / bottom to top and cars crossing left to right
+        :param width: int, frame width
+        :param height: int, frame height
+        :param frames: int, scene length in frames
+        :param people: int, number of pedestrians
+        :param cars: int, number of cars
+        :param seed: int, random seed
+        :return: list of Trajectory
+        """
+
+        rng = np.random.RandomState(seed)
+        trajectories = []
+
+        for _ in range(people):
+                going_down = rng.rand() < 0.5
+                speed = rng.uniform(1, 3) * (1 if going_down else -1)
+                start = (rng.uniform(0.2, 0.8) * width, 0.1 * height if going_down else 0.9 * height)
+                first = rng.randint(0, frames)
+                last = min(frames, first + int(0.8 * height / abs(speed)))
+                trajectories.append(Trajectory(1, start, (0, speed), (40, 90), first, last))
+
+        for _ in range(cars):
+                speed = rng.uniform(5, 10)
+                start = (0, rng.uniform(0.3, 0.7) * height)
+                first = rng.randint(0, frames)
+                last = min(frames, first + int(width / speed))
+                trajectories.append(Trajectory(3, start, (speed, 0), (160, 90), first, last))
+
+        return trajectories
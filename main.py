@@ -1,12 +1,18 @@
-import jetson.inference
-import jetson.utils
 import cv2
 import sys
 import time
-from threading import Timer
-from utils import utils, classes, gpios, cameras, info, tracking, contour
-from trackers.bboxssd import BBox
-from trackers.bboxssdtracker import BBoxTracker
+from utils import utils, classes, cameras, info, contour, capture, conversion, motion, presence, zones
+from utils.spatial import GridIndex
+from utils.risk import RiskEngine
+from utils.alerts import AlertController
+from utils.actuators import ActuatorBank, make_driver
+from utils.latency import LatencyMonitor, Origin
+from detectors import synthetic, postprocess
+from trackers.arraytracker import ArrayTracker
+from trackers.zonetracker import ZoneTracker
+from trackers.correlation import CorrelationStage
+from trackers.flow import FlowEstimator
+from trackers.reid import ReIDCache
 import platform
 import curses
 
@@ -24,12 +30,43 @@ if __name__ == "__main__":
     SHOW = False
     VIDEO = True
     
-    # load the object detection network
+    # object detection backend
+    # "detectnet": jetson.inference detectNet (CUDA)
+    # "opencv": cv2.dnn SSD-MobileNet on CPU
+    # "synthetic": scripted trajectories, no cameras nor net needed
+    BACKEND = "detectnet"
     arch = "ssd-mobilenet-v2"
     overlay = "box,labels,conf"
     threshold = 0.7
     W, H = (800, 480)
-    net = jetson.inference.detectNet(arch, sys.argv, threshold)
+    # local model used by the opencv backend
+    MODEL_PATH = "models/ssd_mobilenet_v2_coco/frozen_inference_graph.pb"
+    CONFIG_PATH = "models/ssd_mobilenet_v2_coco/ssd_mobilenet_v2_coco.pbtxt"
+    # run the net only over the bounding rectangle of the contours
+    ROI_CROP = True
+    ROI_PADDING = 20
+    # skip detection on cameras without motion on their zones
+    MOTION_GATE = True
+    MOTION_IDLE_FRAMES = 10
+    # detect the road at full rate only while a pedestrian is heading
+    # into the crossing, otherwise once every ROAD_BACKGROUND_EVERY frames
+    ROAD_LAZY = True
+    ROAD_BACKGROUND_EVERY = 10
+    # "full": detection + tracking of vehicles
+    # "presence": cheap vehicle presence estimate inside roadContour, no tracking
+    # (see benchmarks/presence.py to compare both on a site)
+    ROAD_MODE = "full"
+    # presence method: "motion" occupancy or "lowres" detector pass (CPU backends)
+    PRESENCE_METHOD = "motion"
+    PRESENCE_SIZE = (150, 150)
+    # hybrid mode for CPU nodes: run the detector every HYBRID_EVERY frames and
+    # follow tracks with correlation trackers in between (1 disables it)
+    HYBRID_EVERY = 1
+    HYBRID_BACKEND = "dlib"
+    HYBRID_WORKERS = 4
+    # pedestrian direction from sparse optical flow inside their boxes,
+    # known from the second frame instead of the second detection
+    FLOW_DIRECTION = False
     
     # Start printing console
     console = curses.initscr()
@@ -49,25 +86,73 @@ if __name__ == "__main__":
         "bus",
         "truck",
     ]
+    # Boolean lookup tables indexed by ClassID
+    pedestrian_table = postprocess.class_table(pedestrian_classes)
+    vehicle_table = postprocess.class_table(vehicle_classes)
     
     # Initialize Trackers
-    ped_tracker_up = BBoxTracker(15)
-    ped_tracker_down = BBoxTracker(15)
-    veh_tracker = BBoxTracker(15)
+    # tracks are kept on numpy arrays, fed with detection arrays
+    # detections further than MAX_DISTANCE pixels are never matched to a track
+    MAX_DISTANCE = 120
+    # grid index for sparse association, worth it in crowds only
+    # (see benchmarks/association.py for the crossover)
+    GRID_INDEX = False
+    # trackers run on capture timestamps: velocities are pixels per second
+    # and tracks missing for their max age in seconds are dropped, whatever the frame rate
+    # the baseline kept tracks TRACK_MAX_FRAMES missed frames: ages are set from the
+    # camera frame rate once capture starts (CAMERA_FPS if the camera reports none)
+    TRACK_MAX_FRAMES = 15
+    CAMERA_FPS = 30
+    # while the road is idle vehicle tracks are only updated every ROAD_BACKGROUND_EVERY
+    # frames (lazy road), so they outlive two background passes to keep their velocity
+    VEHICLE_MAX_FRAMES = max(TRACK_MAX_FRAMES, 2 * ROAD_BACKGROUND_EVERY)
+    # pedestrians slower than this (pixels per second) towards the crossing are standing
+    MIN_CROSSING_SPEED = 10
+    # warnings go on when the top pedestrian - vehicle risk reaches RISK_THRESHOLD
+    # (risk in [0, 1]: heading and time to reach the crossing times vehicle speed)
+    # a pedestrian heading into the crossing scores at least RISK_PEDESTRIAN_FLOOR and
+    # a vehicle on the road at least RISK_VEHICLE_FLOOR: the threshold is their product,
+    # so every baseline warning (heading pedestrian + vehicle present) still goes on,
+    # and closer / faster pairs score higher up to 1
+    RISK_PEDESTRIAN_FLOOR = 0.5
+    RISK_VEHICLE_FLOOR = 0.5
+    RISK_THRESHOLD = RISK_PEDESTRIAN_FLOOR * RISK_VEHICLE_FLOOR
+    # once on, warnings hold until risk drops under RISK_OFF_THRESHOLD (hysteresis)
+    RISK_OFF_THRESHOLD = 0.2
+    # seconds to reach the crossing scoring 1 / e
+    RISK_HORIZON = 3.0
+    # pedestrians hidden longer than their max age (e.g. behind a vehicle)
+    # get their ID and history back when they show up again (cv2 frames only)
+    REID = False
+    # one tracker for the whole crosswalk camera, tracks know their zones
+    # (zone mask is set once contours are selected)
+    ped_tracker = ZoneTracker(maxDistance=MAX_DISTANCE, maxAge=TRACK_MAX_FRAMES / CAMERA_FPS, reid=ReIDCache() if REID else None)
+    veh_tracker = ArrayTracker(maxDistance=MAX_DISTANCE, maxAge=VEHICLE_MAX_FRAMES / CAMERA_FPS)
     
     # check if running on jetson
     is_jetson = utils.is_jetson_platform()
-    # Activate Board
-    if is_jetson: gpios.activate_jetson_board()
     
-    # Initialize Warning scheduler
+    # Warning outputs: "gpio" (Jetson pin 18), "arduino" (USB serial), "loopback" (no hardware)
+    # one warning drives every output, each from its own worker thread
+    # so the detection loop never waits on a device (boards are opened there too)
+    ACTUATORS = ["gpio"] if is_jetson else ["loopback"]
+    
+    # End to end latency, from frame capture to the output acknowledging a warning
+    # per stage p50 / p95 / p99, reported and saved to resources/latency_<SITE>.json at the end
+    SITE = "default"
+    # replaying a video fails when the LATENCY_PERCENTILE of a stage goes over its budget (seconds)
+    LATENCY_BUDGET = {"decision": 0.2, "alert": 0.3}
+    LATENCY_PERCENTILE = 95
+    latency = LatencyMonitor(SITE)
+    actuators = ActuatorBank([make_driver(name) for name in ACTUATORS], listener=latency.ack)
+    
+    # Initialize Warning controller
+    # warnings stay on DELAY_TIME seconds after risk drops, outputs
+    # are only written on state changes, one scheduler thread for the whole run
     DELAY_TIME = 5
-    if is_jetson:
-        # if in Jetson Platform schedule GPIOs power off
-        scheduler = Timer(DELAY_TIME, gpios.warning_OFF, ())
-    else:
-        # if not Jetson Platform schedule dummy GPIOs power off
-        scheduler = Timer(DELAY_TIME, gpios.security_OFF, ())
+    # turning warnings on carries the origin of the deciding frame to the outputs
+    alerts = AlertController(lambda: actuators.on(alerts.origin), actuators.off,
+                             DELAY_TIME, RISK_THRESHOLD, RISK_OFF_THRESHOLD)
     
     # ---------------------------------------
     #
@@ -78,10 +163,19 @@ if __name__ == "__main__":
     VIDEO_PATH = "video/cross_uma_02.webm"
     VIDEO_PATH2 = "video/car_uma_01.webm"
     
+    # Frames kept per camera, oldest frames are dropped
+    RING_SIZE = 2
+    
     # Get two Video Input Resources
     # Rather from VIDEO file (testing) or CAMERA file
     
-    if VIDEO:
+    if BACKEND == "synthetic":
+        # Blank frames, detections come from scripted trajectories
+        print('[*] Starting synthetic cameras...')
+        crosswalkCam = synthetic.SyntheticCamera(W, H)
+        roadCam = synthetic.SyntheticCamera(W, H)
+    
+    elif VIDEO:
         print('[*] Starting video...')
         crosswalkCam = cv2.VideoCapture(VIDEO_PATH)
         roadCam = cv2.VideoCapture(VIDEO_PATH2)
@@ -91,6 +185,8 @@ if __name__ == "__main__":
     
     elif is_jetson:
         # If in jetson platform initialize Cameras from CUDA (faster inferences)
+        # (jetson.utils is only installed on the board)
+        import jetson.utils
         print('[*] Starting camera...')
         # Select Road and Crosswalk cameras
         road_idx, crosswalk_idx = cameras.get_road_and_crosswalk_indexes()
@@ -117,12 +213,119 @@ if __name__ == "__main__":
     crossContourDown = contour.select_points_in_frame(crosswalkCam, 'crossContourDown')
     roadContour = contour.select_points_in_frame(roadCam, 'roadContour')
     
+    # Zone membership lookup tables, cached on resources/
+    # the crossing is the region between both waiting zones
+    crossingContour = zones.between_contours([crossContourUp, crossContourDown], W, H)
+    if len(crossingContour) >= 3:
+        crosswalkContours = [crossContourUp, crossContourDown, crossingContour]
+        crosswalkZones = zones.load_zone_mask(
+            'crosswalkZones', ['crossContourUp', 'crossContourDown', 'crossing'], crosswalkContours, W, H
+        )
+        # Signed distance to every crosswalk zone and its gradient, cached on resources/
+        crosswalkField = zones.load_distance_field('crosswalkField', crosswalkZones, crosswalkContours)
+    else:
+        # waiting zones touch, no crossing between them: pedestrians
+        # score by their approach inside the waiting zones, without field
+        print("[!] No crossing between crossContourUp and crossContourDown, time to enter is not looked up")
+        crosswalkZones = zones.load_zone_mask(
+            'crosswalkZones', ['crossContourUp', 'crossContourDown'], [crossContourUp, crossContourDown], W, H
+        )
+        crosswalkField = None
+    roadZones = zones.load_zone_mask('roadZones', ['roadContour'], [roadContour], W, H)
+    ped_tracker.zones = crosswalkZones
+    
+    # Risk of every pedestrian - vehicle pair, pedestrians score by
+    # their time to enter the crossing, looked up on its distance field if any
+    riskEngine = RiskEngine(
+        crosswalkZones, {'crossContourUp': 'down', 'crossContourDown': 'up'}, RISK_HORIZON, MIN_CROSSING_SPEED,
+        pedestrian_floor=RISK_PEDESTRIAN_FLOOR, vehicle_floor=RISK_VEHICLE_FLOOR, field=crosswalkField
+    )
+    
+    # Spatial grid index over the frame for every tracker
+    if GRID_INDEX:
+        for tracker in (ped_tracker, veh_tracker):
+            tracker.grid = GridIndex(W, H, MAX_DISTANCE)
+    
+    # Regions passed to the net, None means full frame
+    if ROI_CROP:
+        crosswalkRoi = contour.get_contours_roi([crossContourUp, crossContourDown], W, H, ROI_PADDING)
+        roadRoi = contour.get_contours_roi([roadContour], W, H, ROI_PADDING)
+    else:
+        crosswalkRoi, roadRoi = None, None
+    
+    # ---------------------------------------
+    #
+    #      DETECTOR INITIALIZATION
+    #
+    # ---------------------------------------
+    
+    if BACKEND == "detectnet":
+        from detectors.detectnet import DetectNetDetector
+        net = DetectNetDetector(arch, sys.argv, threshold, W, H, overlay)
+    elif BACKEND == "opencv":
+        from detectors.opencvdnn import OpenCVDetector
+        net = OpenCVDetector(MODEL_PATH, CONFIG_PATH, threshold)
+    else:
+        net = synthetic.SyntheticDetector(synthetic.crossing_scenario(W, H))
+    
+    # Presence-only road estimator
+    if ROAD_MODE == "presence":
+        lowresNet = None
+        if PRESENCE_METHOD == "lowres":
+            from detectors.opencvdnn import OpenCVDetector
+            lowresNet = OpenCVDetector(MODEL_PATH, CONFIG_PATH, threshold, PRESENCE_SIZE)
+        vehicle_ids = [classes.index(name) for name in vehicle_classes]
+        roadPresence = presence.RoadPresence(roadContour, W, H, PRESENCE_METHOD, lowresNet, vehicle_ids, roi=roadRoi)
+    
+    # Start one capture worker per camera
+    # gstCamera gives CUDA frames, VideoCapture gives numpy frames
+    cuda_capture = is_jetson and not VIDEO and BACKEND == "detectnet"
+    if cuda_capture and ROAD_MODE == "presence":
+        raise Exception("Presence road mode needs cv2 frames, not available with gstCamera")
+    # Video files are read at their own frame rate, synthetic cameras at theirs
+    video_fps = crosswalkCam.get(cv2.CAP_PROP_FPS) if VIDEO or BACKEND == "synthetic" else None
+    capturePair = capture.CapturePair(crosswalkCam, roadCam, cuda_capture, RING_SIZE, video_fps)
+    capturePair.start()
+    
+    # Track ages in seconds at the rate frames come in
+    # (cv2 cameras report theirs, gstCamera does not)
+    camera_fps = video_fps or (crosswalkCam.get(cv2.CAP_PROP_FPS) if not is_jetson else None) or CAMERA_FPS
+    ped_tracker.maxAge = TRACK_MAX_FRAMES / camera_fps
+    veh_tracker.maxAge = VEHICLE_MAX_FRAMES / camera_fps
+    
+    # Motion gates watching the zones of each camera
+    crosswalkGate = motion.MotionGate([crossContourUp, crossContourDown], W, H, idle_frames=MOTION_IDLE_FRAMES)
+    roadGate = motion.MotionGate([roadContour], W, H, idle_frames=MOTION_IDLE_FRAMES)
+    
+    # Preallocated conversion buffers, one converter per stream
+    crosswalkConverter = conversion.FrameConverter(W, H, SHOW)
+    roadConverter = conversion.FrameConverter(W, H, SHOW)
+    
+    # Correlation trackers following each camera between keyframes
+    # (they need numpy frames, not available with gstCamera)
+    hybrid = HYBRID_EVERY > 1 and not cuda_capture
+    if hybrid:
+        crosswalkFollower = CorrelationStage(HYBRID_BACKEND, HYBRID_WORKERS)
+        roadFollower = CorrelationStage(HYBRID_BACKEND, HYBRID_WORKERS)
+    
+    # Optical flow of pedestrian tracks (numpy frames only)
+    flow = FLOW_DIRECTION and not cuda_capture
+    if flow:
+        crosswalkFlow = FlowEstimator()
+    
     # ---------------------------------------
     #
     #      VIDEO PROCESSING MAIN LOOP
     #
     # ---------------------------------------
     
+    # processed frames of each camera and whether a pedestrian was heading into the crossing
+    crosswalk_frame_idx, road_frame_idx = 0, 0
+    road_promoted = False
+    # last results, kept while a camera has no new frame
+    crosswalkActive, roadActive = True, True
+    pedestrians, vehicles, vehicle_present = {}, {}, False
+    
     while True:
         
         start_time = time.time()  # start time of the loop
@@ -133,38 +336,80 @@ if __name__ == "__main__":
         #
         # ---------------------------------------
         
-        # if we are on Jetson use jetson inference
-        if is_jetson:
-            
-            # get frame from crosswalk and detect
-            crosswalkMalloc, _, _ = crosswalkCam.CaptureRGBA()
-            pedestrianDetections = net.Detect(crosswalkMalloc, W, H, overlay)
-            # get frame from road and detect
-            roadMalloc, _, _ = roadCam.CaptureRGBA()
-            vehicleDetections = net.Detect(roadMalloc, W, H, overlay)
-        
-        # If we are NOT on jetson use CV2
-        else:
+        # Take the freshest pair of frames, never wait on the cameras
+        frames = capturePair.freshest()
+        if frames is None:
             # Check if more frames are available
-            if crosswalkCam.grab() and roadCam.grab():
-                # capture the image
-                _, crosswalkFrame = crosswalkCam.read()
-                _, roadFrame = roadCam.read()
-            else:
+            if capturePair.finished:
+                # leave the curses console before printing the report
+                curses.endwin()
                 print("no more frames")
+                capturePair.stop()
+                alerts.close()
+                actuators.close()
+                if hybrid:
+                    crosswalkFollower.close()
+                    roadFollower.close()
+                print(latency.report())
+                latency.save("resources/latency_{}.json".format(SITE))
+                if VIDEO:
+                    latency.check_budget(LATENCY_BUDGET, LATENCY_PERCENTILE)
                 break
-            
-            # Synchronize system
-            jetson.utils.cudaDeviceSynchronize()
+            capturePair.wait()
+            continue
+        # only the cameras with a new frame are gated, detected and tracked
+        (crosswalkTime, crosswalkFrame, crosswalkNew), (roadTime, roadFrame, roadNew) = frames
+        
+        # Lazy road: full rate while pedestrians head into the crossing,
+        # background cadence otherwise to keep the vehicle tracker warm
+        roadScheduled = roadNew and (not ROAD_LAZY or road_promoted or road_frame_idx % ROAD_BACKGROUND_EVERY == 0)
+        # the net only runs on the road in full mode
+        roadDetect = ROAD_MODE == "full"
+        # Hybrid mode: the detector only runs on keyframes of each camera
+        keyframe = crosswalkNew and (not hybrid or crosswalk_frame_idx % HYBRID_EVERY == 0)
+        roadScheduled = roadScheduled and (not hybrid or road_frame_idx % HYBRID_EVERY == 0)
+        if crosswalkNew: crosswalk_frame_idx += 1
+        if roadNew: road_frame_idx += 1
+        
+        # Motion gate: cameras without motion on their zones for
+        # MOTION_IDLE_FRAMES frames, or frozen, are not detected
+        # (gates need real numpy frames, CUDA and synthetic cameras are always detected)
+        if MOTION_GATE and not cuda_capture and BACKEND != "synthetic":
+            if crosswalkNew: crosswalkActive = crosswalkGate.update(crosswalkFrame)
+            if roadNew: roadActive = roadGate.update(roadFrame)
+            consoleConfig.frozen = crosswalkGate.frozen or roadGate.frozen
+        else:
+            crosswalkActive, roadActive = True, True
+        
+        # if capturing from CUDA cameras frames are already CUDA Mallocs
+        # CPU backends take CV2 frames as they are
+        crosswalkInput, roadInput = crosswalkFrame, roadFrame
+        # captured frames, for correlation trackers, flow and re-ID
+        crosswalkImage, roadImage = crosswalkFrame, roadFrame
+        reidImage = None if cuda_capture else crosswalkImage
+        
+        # detectNet fed from CV2 frames
+        if net.input_format == 'cuda' and not cuda_capture:
             
             # Get Cuda Malloc to be used by the net
-            # Get processes frame to fit Cuda Malloc Size
-            crosswalkFrame, crosswalkMalloc = utils.frameToCuda(crosswalkFrame, W, H)
-            roadFrame, roadMalloc = utils.frameToCuda(roadFrame, W, H)
-            
-            # Get detections Detectnet.Detection Object
-            pedestrianDetections = net.Detect(crosswalkMalloc, W, H, overlay)
-            vehicleDetections = net.Detect(roadMalloc, W, H, overlay)
+            # Get processes frame to fit Cuda Malloc Size (None if not SHOW)
+            if crosswalkActive and keyframe:
+                crosswalkFrame, crosswalkInput = crosswalkConverter.convert(crosswalkFrame)
+            if roadActive and roadScheduled and roadDetect:
+                roadFrame, roadInput = roadConverter.convert(roadFrame)
+        
+        # Idle cameras are not detected, their trackers get an empty update
+        if not crosswalkActive or not keyframe: crosswalkInput = None
+        if not roadActive: roadInput = None
+        
+        # Get detections as detectors.detection.Detection records
+        # both cameras run as a single batch and are split back by source
+        # only the contours ROI is detected, coordinates come back in full frame
+        pedestrianDetections, vehicleDetections = net.detect_in_rois(
+            [crosswalkInput, roadInput if roadScheduled and roadDetect else None],
+            ['crosswalk', 'road'],
+            [crosswalkRoi, roadRoi]
+        )
         
         # ---------------------------------------
         #
@@ -172,36 +417,72 @@ if __name__ == "__main__":
         #
         # ---------------------------------------
         
-        # Initialize bounding boxes lists
-        ped_up_bboxes = []
-        ped_down_bboxes = []
-        veh_bboxes = []
+        if crosswalkNew:
+            
+            # Crosswalk Detections as one structured array
+            # filter detections recognised as pedestrians, zones are looked up by the tracker
+            pedArray = postprocess.detections_to_array(pedestrianDetections)
+            is_pedestrian = postprocess.filter_classes(pedArray, pedestrian_table)
+            
+            # Relate previous detections to new ones
+            # updating pedestrian trackers first
+            # every pedestrian is associated once, also between zones,
+            # so IDs survive walking from one side to the other
+            if keyframe:
+                pedestrians = ped_tracker.update(pedArray[is_pedestrian], crosswalkTime, reidImage)
+                # re-sync correlation trackers with the detector
+                if hybrid: crosswalkFollower.start(crosswalkImage, ped_tracker)
+            else:
+                # between keyframes pedestrians follow their correlation trackers
+                pedestrians = ped_tracker.update(crosswalkFollower.update(crosswalkImage), crosswalkTime, reidImage)
+            
+            # flow velocity observed on every frame, detected or not
+            if flow: crosswalkFlow.update(crosswalkImage, ped_tracker, crosswalkTime)
+        
+        ped_up_crossing = ped_tracker.is_any_moving_in_direction('crossContourUp', 'down', MIN_CROSSING_SPEED)
+        ped_down_crossing = ped_tracker.is_any_moving_in_direction('crossContourDown', 'up', MIN_CROSSING_SPEED)
         
-        # Convert Crosswalk Detections to Bbox object
-        # filter detections if recognised as pedestrians
-        # add to pedestrian list of bboxes
-        for detection in pedestrianDetections:
-            bbox = BBox(detection)
-            if bbox.name in pedestrian_classes:
-                if tracking.is_point_in_contour(crossContourUp, bbox.center):
-                    ped_up_bboxes.append(bbox)
-                if tracking.is_point_in_contour(crossContourDown, bbox.center):
-                    ped_down_bboxes.append(bbox)
+        # A pedestrian is heading into the crossing and the new road frame was
+        # not scheduled: detect the road now, on this same frame
+        roadPending = (ped_up_crossing or ped_down_crossing) and roadNew and not roadScheduled
+        if roadPending and roadDetect:
+            if roadActive and net.input_format == 'cuda' and not cuda_capture:
+                roadFrame, roadInput = roadConverter.convert(roadFrame)
+            vehicleDetections, = net.detect_in_rois([roadInput], ['road'], [roadRoi])
         
-        # Convert Road Detections to Bbox object
-        # filter detections if recognised as vehicles
-        # add to vehicle list of bboxes
-        for detection in vehicleDetections:
-            bbox = BBox(detection)
-            is_bbox_in_contour = tracking.is_point_in_contour(roadContour, bbox.center)
-            if bbox.name in vehicle_classes and is_bbox_in_contour:
-                veh_bboxes.append(bbox)
+        # Promote road to full rate while pedestrians are heading into the crossing
+        road_promoted = ped_up_crossing or ped_down_crossing
         
-        # Relate previous detections to new ones
-        # updating trackers
-        pedestriansUp = ped_tracker_up.update(ped_up_bboxes)
-        pedestriansDown = ped_tracker_down.update(ped_down_bboxes)
-        vehicles = veh_tracker.update(veh_bboxes)
+        if not roadNew:
+            # vehicles were already tracked on this road frame
+            pass
+        
+        elif ROAD_MODE == "presence":
+            
+            # Cheap estimate, road frame is never converted nor detected
+            # (motion needs every frame to compare with the previous one)
+            vehicle_present = roadPresence.update(roadFrame)
+            vehicles = {}
+        
+        elif roadScheduled or roadPending:
+            
+            # Road Detections as one structured array
+            # filter detections recognised as vehicles inside roadContour
+            vehArray = postprocess.detections_to_array(vehicleDetections)
+            in_road = postprocess.filter_classes(vehArray, vehicle_table)
+            in_road &= roadZones.in_zone(vehArray['center'], 'roadContour')
+            
+            vehicles = veh_tracker.update(vehArray[in_road], roadTime)
+            if hybrid: roadFollower.start(roadImage, veh_tracker)
+        
+        elif hybrid:
+            # vehicles follow their correlation trackers until next road detection
+            vehicles = veh_tracker.update(roadFollower.update(roadImage), roadTime)
+        
+        else:
+            # road not detected on this frame: vehicles keep moving
+            # along their Kalman prediction until next background frame
+            vehicles = veh_tracker.predict(roadTime)
         
         # ---------------------------------------
         #
@@ -209,25 +490,20 @@ if __name__ == "__main__":
         #
         # ---------------------------------------
         
-        ped_up_crossing = tracking.is_any_bbox_moving_in_direction(pedestriansUp.values(), 'down')
-        ped_down_crossing = tracking.is_any_bbox_moving_in_direction(pedestriansDown.values(), 'up')
+        # top risk over every pedestrian - vehicle pair
+        # (presence mode knows no vehicle tracks, only whether there is one)
+        if ROAD_MODE == "presence":
+            risk = riskEngine.assess(ped_tracker, None, vehicle_present)
+        else:
+            risk = riskEngine.assess(ped_tracker, veh_tracker)
+        consoleConfig.risk = risk
         
-        if veh_bboxes and (ped_up_crossing or ped_down_crossing):
-            # Security actions Here
-            if is_jetson:
-                # Activate Warnings
-                gpios.warning_ON()
-                # Deactivate Warnings after DELAY_TIME
-                scheduler.cancel()
-                scheduler = Timer(DELAY_TIME, gpios.warning_OFF, ())
-                scheduler.start()
-            
-            else:
-                
-                # Deactivate Warnings after DELAY_TIME
-                scheduler.cancel()  # Cancel every possible Scheduler Thread
-                scheduler = Timer(DELAY_TIME, gpios.security_OFF, ())  # Restart
-                scheduler.start()
+        # Security actions Here
+        # ON / HOLD / OFF state machine, warnings switch only on state changes
+        # origin: capture of the newest frame and of the first frame of the risky pedestrian
+        decisionTime = max(crosswalkTime if crosswalkNew else 0, roadTime if roadNew else 0)
+        alerts.update(risk.score, Origin(decisionTime, ped_tracker.first_seen_of(risk.pedestrian)))
+        latency.decision(decisionTime)
         
         # ---------------------------------------
         #
@@ -236,11 +512,14 @@ if __name__ == "__main__":
         # ---------------------------------------
         
         consoleConfig.fps = 1.0 / (time.time() - start_time)
-        consoleConfig.warnings = scheduler.is_alive()  # if True warnings are still ON
+        consoleConfig.warnings = alerts.active  # if True warnings are still ON
+        consoleConfig.actuators = actuators.summary()
         
         # Transform CUDA MALLOC to NUMPY frame
         # is highly computationally expensive for Jetson Platforms
-        if SHOW and not is_jetson:
+        if SHOW and not cuda_capture:
+            # re-ID describes tracks going missing on this frame at the next update
+            if REID: crosswalkFrame = crosswalkFrame.copy()
             # Activate Visual Warnings
             cv2.rectangle(crosswalkFrame, (0, 0), (200, 200), (255, 255, 255), -1)
             
@@ -250,8 +529,7 @@ if __name__ == "__main__":
             contour.drawContour(crosswalkFrame, crossContourDown)
             
             # Print square detections into frame
-            crosswalkFrame = info.print_items_to_frame(crosswalkFrame, pedestriansUp)
-            crosswalkFrame = info.print_items_to_frame(crosswalkFrame, pedestriansDown)
+            crosswalkFrame = info.print_items_to_frame(crosswalkFrame, pedestrians)
             
             roadFrame = info.print_items_to_frame(roadFrame, vehicles)
             roadFrame = info.print_fps_on_frame(roadFrame, consoleConfig.fps)
@@ -272,11 +550,17 @@ if __name__ == "__main__":
         # Quit program pressing 'q'
         key = cv2.waitKey(1) & 0xFF
         if key == ord("q"):
-            # free GPIOs before quit
-            if is_jetson:
-                gpios.warning_OFF()
-                gpios.deactivate_jetson_board()
+            # turn warnings off and free GPIOs before quit
+            alerts.close()
+            actuators.close()
+            # stop capture workers
+            capturePair.stop()
+            if hybrid:
+                crosswalkFollower.close()
+                roadFollower.close()
             # close any open windows
             curses.endwin()
             cv2.destroyAllWindows()
+            print(latency.report())
+            latency.save("resources/latency_{}.json".format(SITE))
             break
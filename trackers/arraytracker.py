@@ -0,0 +1,548 @@
+from collections import OrderedDict
+import numpy as np
+from utils import classes
+from utils.association import associate, associate_grid
+from trackers.kalman import KalmanBank
+
+
+class TrackView:
+
+        """
+        Thin read only view of one tracker slot
+        Exposes the same attributes as bboxssd.BBox
+        so drawing and direction checks work unchanged
+        """
+
+        __slots__ = ('tracker', 'slot')
+
+        def __init__(self, tracker, slot):
+                self.tracker = tracker
+                self.slot = slot
+
+        @property
+        def name(self):
+                return classes.classesDict[self.tracker.class_ids[self.slot]]
+
+        @property
+        def color(self):
+                return classes.classesColors.get(self.name, classes.classesColors['unknown'])
+
+        @property
+        def start_point(self):
+                left, top, _, _ = self.tracker.boxes[self.slot]
+                return int(left), int(top)
+
+        @property
+        def end_point(self):
+                _, _, right, bottom = self.tracker.boxes[self.slot]
+                return int(right), int(bottom)
+
+        @property
+        def center(self):
+                x, y = self.tracker.centers[self.slot]
+                return int(x), int(y)
+
+        @property
+        def dx(self):
+                return float(self.tracker.velocities[self.slot, 0])
+
+        @property
+        def dy(self):
+                return float(self.tracker.velocities[self.slot, 1])
+
+        @property
+        def mov(self):
+                # velocity is known from the second detection or the first flow
+                if self.tracker.samples[self.slot] < 2 and self.tracker.flow_samples[self.slot] == 0:
+                        return ['unknown', 'unknown']
+                return ['left' if self.dx < 0 else 'right', 'up' if self.dy < 0 else 'down']
+
+        @property
+        def status(self):
+                return 'stop'
+
+
+class ArrayTracker:
+
+        """
+        Struct of arrays version of bboxssdtracker.BBoxTracker
+        Every live track lives on a slot of preallocated numpy arrays,
+        slots are recycled through a free list and association,
+        aging and deregistration run vectorized
+        Motion is a batched constant velocity Kalman filter: association
+        uses predicted positions and predict() keeps tracks moving on
+        frames where the detector did not run
+        update() takes the structured arrays of detectors.postprocess
+        With maxAge the tracker runs on capture timestamps: velocities
+        are pixels per second and tracks expire after maxAge seconds,
+        so nothing changes meaning when the frame rate drops
+        With a trackers.reid.ReIDCache expired tracks are kept aside and
+        new detections looking alike take back their ID and state
+        (update() needs the frame to describe detections). Appearance is
+        only described for tracks going missing, on the last frame they
+        were seen, and for new detections while there are lost tracks
+        """
+
+        # view class handed out by objects
+        view = TrackView
+
+        def __init__(self, maxDisappeared=50, capacity=64, maxDistance=None, minIoU=0.0, grid=None, maxAge=None, reid=None):
+
+                # slots of live tracks and free slots (stack)
+                self.capacity = 0
+                self.free = []
+                self.nextObjectID = 0
+                self.maxDisappeared = maxDisappeared
+                # association gate: pairs further than maxDistance
+                # or overlapping less than minIoU are never matched
+                self.maxDistance = maxDistance
+                self.minIoU = minIoU
+                # utils.spatial.GridIndex for sparse association in crowds
+                # (its max_distance is the gate), None for dense matrices
+                self.grid = grid
+                # seconds a track survives without detections, None counts
+                # frames instead (maxDisappeared) and velocities are per frame
+                self.maxAge = maxAge
+                # capture timestamp of the last update / predict
+                self.timestamp = None
+                # number of updates, clock of the re-ID cache without timestamps
+                self.updates = 0
+                # trackers.reid.ReIDCache of lost tracks, None disables re-identification
+                self.reid = reid
+
+                self.ids = np.empty(0, dtype=np.int64)
+                self.alive = np.empty(0, dtype=bool)
+                self.class_ids = np.empty(0, dtype=np.int32)
+                self.boxes = np.empty((0, 4), dtype=np.float32)
+                self.centers = np.empty((0, 2), dtype=np.float32)
+                self.disappeared = np.empty(0, dtype=np.int32)
+                # number of observations of every track
+                self.samples = np.empty(0, dtype=np.int64)
+                # number of velocity observations (optical flow) of every track
+                self.flow_samples = np.empty(0, dtype=np.int64)
+                # capture timestamp of the last detection of every track
+                self.last_seen = np.empty(0, dtype=np.float64)
+                # and of the first one (nan without timestamps)
+                self.first_seen = np.empty(0, dtype=np.float64)
+                # frame of the last update, tracks going missing are described on it
+                self.frame = None
+                # appearance descriptor of every track (re-ID only), set when it goes missing
+                self.descriptors = np.empty((0, reid.size if reid is not None else 0), dtype=np.float32)
+                if maxAge is None:
+                        self.kalman = KalmanBank(0)
+                else:
+                        # velocity and acceleration variances in pixels per second
+                        self.kalman = KalmanBank(0, velocity_var=1e5, process_var=2500.0)
+
+                self.grow(capacity)
+
+        def grow(self, capacity):
+
+                """
+                Enlarges every array to capacity slots
+                :param capacity: int, new number of slots
+                """
+
+                extra = capacity - self.capacity
+                if extra <= 0:
+                        return
+
+                def pad(array, fill=0):
+                        padding = np.full((extra,) + array.shape[1:], fill, dtype=array.dtype)
+                        return np.concatenate([array, padding])
+
+                self.ids = pad(self.ids, -1)
+                self.alive = pad(self.alive, False)
+                self.class_ids = pad(self.class_ids)
+                self.boxes = pad(self.boxes)
+                self.centers = pad(self.centers)
+                self.disappeared = pad(self.disappeared)
+                self.samples = pad(self.samples)
+                self.flow_samples = pad(self.flow_samples)
+                self.last_seen = pad(self.last_seen)
+                self.first_seen = pad(self.first_seen)
+                self.descriptors = pad(self.descriptors)
+                self.kalman.grow(capacity)
+
+                # new slots are used lowest first
+                self.free.extend(range(capacity - 1, self.capacity - 1, -1))
+                self.capacity = capacity
+
+        @property
+        def velocities(self):
+
+                """
+                Kalman velocities of every slot
+                (pixels per second with maxAge, pixels per frame otherwise)
+                """
+
+                return self.kalman.velocities
+
+        @property
+        def has_velocity(self):
+
+                """
+                Slots whose velocity was observed: from the second
+                detection or the first velocity observation
+                """
+
+                return (self.samples >= 2) | (self.flow_samples > 0)
+
+        @property
+        def live(self):
+
+                """
+                Slots of live tracks, ordered by object ID
+                """
+
+                slots = np.flatnonzero(self.alive)
+                return slots[np.argsort(self.ids[slots], kind='stable')]
+
+        @property
+        def fresh(self):
+
+                """
+                Slots of live tracks matched on the last update, ordered by object ID
+                (tracks only predicted since then are still fresh)
+                """
+
+                slots = self.live
+                return slots[self.disappeared[slots] == 0]
+
+        @property
+        def objects(self):
+
+                """
+                Dict of objects view: object ID -> TrackView
+                """
+
+                return OrderedDict(
+                        (int(self.ids[slot]), self.view(self, slot)) for slot in self.live
+                )
+
+        def __len__(self):
+                return int(self.alive.sum())
+
+        def first_seen_of(self, object_id):
+
+                """
+                :param object_id: int
+                :return: float, capture timestamp of the first detection of a live track,
+                         None if not tracked or tracking without timestamps
+                """
+
+                slots = np.flatnonzero(self.alive & (self.ids == object_id))
+                if len(slots) == 0 or np.isnan(self.first_seen[slots[0]]):
+                        return None
+                return float(self.first_seen[slots[0]])
+
+        def elapsed(self, timestamp):
+
+                """
+                Time since the previous update and keeps timestamp as the last one
+                :param timestamp: float, capture time in seconds, None counts one frame
+                :return: float, seconds between captures or 1.0 frame
+                """
+
+                if timestamp is None:
+                        return 1.0
+
+                dt = 0.0 if self.timestamp is None else max(0.0, timestamp - self.timestamp)
+                self.timestamp = timestamp
+
+                return dt
+
+        def now(self, timestamp):
+
+                """
+                Clock of the re-ID cache: capture time or number of updates
+                """
+
+                return timestamp if timestamp is not None else self.updates
+
+        def allocate(self, n):
+
+                """
+                Takes n free slots, growing the arrays if needed
+                :param n: int
+                :return: numpy array of slots
+                """
+
+                if n > len(self.free):
+                        self.grow(max(2 * self.capacity, self.capacity + n))
+
+                slots = np.array(self.free[-n:][::-1], dtype=np.intp)
+                del self.free[-n:]
+
+                return slots
+
+        def register(self, detections, timestamp=None):
+
+                """
+                Starts a track for every detection
+                :param detections: structured array of detectors.postprocess.DETECTION_DTYPE
+                :param timestamp: float, capture time of the detections
+                :return: numpy array of used slots
+                """
+
+                n = len(detections)
+                if n == 0:
+                        return np.empty(0, dtype=np.intp)
+
+                slots = self.allocate(n)
+
+                self.ids[slots] = np.arange(self.nextObjectID, self.nextObjectID + n)
+                self.nextObjectID += n
+                self.alive[slots] = True
+                self.class_ids[slots] = detections['class_id']
+                self.boxes[slots] = detections['ltrb']
+                self.centers[slots] = detections['center']
+                self.disappeared[slots] = 0
+                self.samples[slots] = 1
+                self.flow_samples[slots] = 0
+                if timestamp is not None:
+                        self.last_seen[slots] = timestamp
+                self.first_seen[slots] = np.nan if timestamp is None else timestamp
+                self.kalman.init(slots, detections['center'])
+
+                return slots
+
+        def state(self, slot):
+
+                """
+                Motion state of one track, kept by the re-ID cache when lost
+                :param slot: int
+                :return: dict
+                """
+
+                return {
+                        'x': self.kalman.x[slot].copy(),
+                        'P': self.kalman.P[slot].copy(),
+                        'samples': int(self.samples[slot]),
+                        'flow_samples': int(self.flow_samples[slot]),
+                        'descriptor': self.descriptors[slot].copy(),
+                        'first_seen': float(self.first_seen[slot]),
+                }
+
+        def restore(self, slot, state):
+                self.kalman.x[slot] = state['x']
+                self.kalman.P[slot] = state['P']
+                self.samples[slot] = state['samples']
+                self.flow_samples[slot] = state['flow_samples']
+                self.descriptors[slot] = state['descriptor']
+                self.first_seen[slot] = state['first_seen']
+
+        def revive(self, detections, timestamp=None, descriptors=None):
+
+                """
+                Gives detections matching lost tracks of the re-ID cache
+                their old ID and state back
+                :param detections: structured array of new detections
+                :param timestamp: float, capture time of the detections
+                :param descriptors: numpy array (N, D), appearance of the detections
+                :return: numpy array of revived detection indexes
+                """
+
+                now = self.now(timestamp)
+                cols, matches = self.reid.match(descriptors, detections['center'], now)
+                if not matches:
+                        return cols
+
+                slots = self.allocate(len(matches))
+                for slot, (object_id, state, _) in zip(slots, matches):
+                        self.ids[slot] = object_id
+                        self.restore(slot, state)
+                self.alive[slots] = True
+
+                # lost tracks kept moving while hidden
+                self.kalman.predict(slots, np.array([now - lost_at for _, _, lost_at in matches], dtype=np.float64))
+                self.move(slots, detections[cols], timestamp)
+
+                return cols
+
+        def admit(self, detections, timestamp=None, frame=None):
+
+                """
+                Registers unmatched detections, reviving lost tracks first
+                Detections are only described while the re-ID cache has lost tracks
+                :param detections: structured array of new detections
+                :param timestamp: float, capture time of the detections
+                :param frame: numpy BGR array of the detections, None skips re-ID
+                """
+
+                if self.reid is not None and frame is not None and len(detections):
+                        self.reid.expire(self.now(timestamp))
+                        if len(self.reid):
+                                descriptors = self.reid.describe(frame, detections['ltrb'])
+                                revived = self.revive(detections, timestamp, descriptors)
+                                rest = np.setdiff1d(np.arange(len(detections)), revived, assume_unique=True)
+                                detections = detections[rest]
+
+                self.register(detections, timestamp)
+
+        def describe_missing(self, slots, boxes):
+
+                """
+                Describes the tracks going missing on this update, one batch
+                on the frame of the previous update, where they were last seen
+                :param slots: numpy array of unmatched slots
+                :param boxes: numpy array (N, 4), their boxes on the previous update
+                """
+
+                if self.reid is None or self.frame is None:
+                        return
+
+                missing = self.disappeared[slots] == 0
+                if missing.any():
+                        self.descriptors[slots[missing]] = self.reid.describe(self.frame, boxes[missing])
+
+        def deregister(self, slots):
+
+                """
+                Frees the slots of the given tracks
+                :param slots: numpy array of slots
+                """
+
+                self.alive[slots] = False
+                self.ids[slots] = -1
+                self.free.extend(int(slot) for slot in slots)
+
+        def deregisterall(self):
+                self.deregister(np.flatnonzero(self.alive))
+
+        def age(self, slots, timestamp=None):
+
+                """
+                Marks tracks as disappeared during one frame
+                and deregisters those missing for too long
+                (over maxAge seconds, or maxDisappeared frames)
+                :param slots: numpy array of slots
+                :param timestamp: float, capture time of the current frame
+                """
+
+                self.disappeared[slots] += 1
+                if self.maxAge is not None and timestamp is not None:
+                        expired = slots[timestamp - self.last_seen[slots] > self.maxAge]
+                else:
+                        expired = slots[self.disappeared[slots] > self.maxDisappeared]
+
+                # lost tracks are kept aside for re-identification
+                if self.reid is not None:
+                        for slot in expired:
+                                self.reid.add(int(self.ids[slot]), self.state(slot), self.now(timestamp))
+                self.deregister(expired)
+
+        def assign(self, slots, detections):
+
+                """
+                Matches tracks to detections
+                :param slots: numpy array of live slots
+                :param detections: structured array of detections
+                :return: matched slots, matched detection indexes
+                """
+
+                if self.grid is not None:
+                        rows, cols = associate_grid(self.boxes[slots], detections['ltrb'], self.grid, self.minIoU)
+                else:
+                        rows, cols = associate(self.boxes[slots], detections['ltrb'], self.maxDistance, self.minIoU)
+
+                return slots[rows], cols
+
+        def predict(self, timestamp=None):
+
+                """
+                Moves every live track to its predicted position
+                To be called on frames where the detector was skipped,
+                tracks are not marked as disappeared
+                :param timestamp: float, capture time of the frame, None advances one frame
+                """
+
+                self.predict_slots(np.flatnonzero(self.alive), self.elapsed(timestamp))
+
+                return self.objects
+
+        def predict_slots(self, slots, dt=1.0):
+                self.kalman.predict(slots, dt)
+                shift = self.kalman.positions[slots] - self.centers[slots]
+                self.centers[slots] += shift
+                self.boxes[slots] += np.tile(shift, 2)
+
+        def move(self, slots, detections, timestamp=None):
+
+                """
+                Updates matched tracks with their new detections
+                :param slots: numpy array of slots
+                :param detections: structured array of matched detections
+                :param timestamp: float, capture time of the detections
+                """
+
+                self.kalman.correct(slots, detections['center'])
+                self.samples[slots] += 1
+
+                self.class_ids[slots] = detections['class_id']
+                self.boxes[slots] = detections['ltrb']
+                self.centers[slots] = detections['center']
+                self.disappeared[slots] = 0
+                if timestamp is not None:
+                        self.last_seen[slots] = timestamp
+
+        def observe_velocity(self, slots, velocities, variance):
+
+                """
+                Corrects tracks with measured velocities, e.g. optical flow
+                :param slots: numpy array of slots
+                :param velocities: numpy array (N, 2), same units as the tracker velocities
+                :param variance: float or numpy array (N,), measurement variance
+                """
+
+                self.kalman.correct_velocity(slots, velocities, variance)
+                self.flow_samples[slots] += 1
+
+        def update(self, detections, timestamp=None, frame=None):
+
+                """
+                Relates tracked objects to new detections
+                :param detections: structured array of detectors.postprocess.DETECTION_DTYPE
+                :param timestamp: float, capture time of the frame (time.monotonic),
+                                  None advances one frame
+                :param frame: numpy BGR array the detections come from, for re-ID,
+                              kept until the next update (it must not be drawn on)
+                :return: dict of objects view
+                """
+
+                self.updates += 1
+                live = np.flatnonzero(self.alive)
+                # boxes where tracks were last seen, to describe those going missing
+                previous = self.boxes[live] if self.reid is not None else None
+
+                # tracks move to their predicted position before association
+                self.predict_slots(live, self.elapsed(timestamp))
+
+                # No detections: every object disappears one frame
+                if len(detections) == 0:
+                        self.describe_missing(live, previous)
+                        self.age(live, timestamp)
+                        self.frame = frame
+                        return self.objects
+
+                # No objects: every detection is a new object
+                if len(live) == 0:
+                        self.admit(detections, timestamp, frame)
+                        self.frame = frame
+                        return self.objects
+
+                matched_slots, matched_cols = self.assign(live, detections)
+                self.move(matched_slots, detections[matched_cols], timestamp)
+
+                # tracks and detections left without a match
+                unmatched = ~np.isin(live, matched_slots)
+                unmatched_slots = live[unmatched]
+                unmatched_cols = np.setdiff1d(np.arange(len(detections)), matched_cols, assume_unique=True)
+
+                if previous is not None:
+                        self.describe_missing(unmatched_slots, previous[unmatched])
+                self.age(unmatched_slots, timestamp)
+                self.admit(detections[unmatched_cols], timestamp, frame)
+                self.frame = frame
+
+                return self.objects
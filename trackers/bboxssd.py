@@ -1,66 +1,103 @@
 from utils import classes
-from collections import deque
+import numpy as np
 
 
 class BBox:
 
-        def __init__(self, detection):
+        __slots__ = (
+                'class_id', 'name', 'start_point', 'end_point', 'center', 'color',
+                'status', 'mov', 'dx', 'dy', 'coef', 'memory', 'times', 'samples', 'timestamp'
+        )
 
-                self.detection = detection
-                self.name = classes.classesDict[detection.ClassID]
-                self.start_point = (int(detection.Left), int(detection.Top))
-                self.end_point = (int(detection.Right), int(detection.Bottom))
-                self.center = tuple(map(int, detection.Center))
-
-                # Colors for known classes
-                self.colors = {
-                        'person': (255, 0, 0),
-                        'car': (0, 255, 0),
-                        'bicycle': (0, 0, 255),
-                        'motorcycle': (255, 255, 0),
-                        'bus': (0, 255, 255),
-                        'truck': (255, 0, 255),
-                        'unknown': (255, 255, 255)
-                }
+        # number of centers used to compute movement
+        memory_size = 5
 
-                # Set color only to known classes
-                self.color = self.colors[self.name] if self.name in self.colors.keys() else self.colors['unknown']
+        def __init__(self, detection=None, timestamp=None):
 
                 # Initialize Movement variables
                 # It tracks whether the object is going
                 # up down right or left
+                self.mov = ['unknown', 'unknown']
+
+                # Fixed size ring of last centers
+                self.memory = np.zeros((self.memory_size, 2), dtype=np.int32)
+                # and their capture timestamps
+                self.times = np.zeros(self.memory_size, dtype=np.float64)
+
+                if detection is not None:
+                        self.reset(detection, timestamp)
+
+        def reset(self, detection, timestamp=None):
+
+                """
+                (Re)initializes the bbox from a detection
+                Only plain numbers are kept, not the detection itself
+                :param detection: detectors.detection.Detection or detectNet.Detection
+                :param timestamp: float, capture time of the frame (time.monotonic)
+                """
+
+                self.class_id = detection.ClassID
+                self.name = classes.classesDict[detection.ClassID]
+                self.set_points(detection.Left, detection.Top, detection.Right, detection.Bottom, detection.Center)
+
+                # Set color only to known classes
+                self.color = classes.classesColors.get(self.name, classes.classesColors['unknown'])
 
                 self.status = 'stop'
-                self.mov = ['unknown', 'unknown']
+                self.mov[0] = 'unknown'
+                self.mov[1] = 'unknown'
                 self.dx = 0
-                self. dy = 0
+                self.dy = 0
                 self.coef = 0
 
-                self.memory = deque([], maxlen=5)
-                self.memory.append(self.center)
+                self.timestamp = timestamp
+                self.memory[0] = self.center
+                self.times[0] = timestamp if timestamp is not None else 0
+                self.samples = 1
 
-        def update(self, bbox):
+        def set_points(self, left, top, right, bottom, center):
+                self.start_point = (int(left), int(top))
+                self.end_point = (int(right), int(bottom))
+                self.center = (int(center[0]), int(center[1]))
 
-                detection = bbox.detection
+        def update(self, bbox):
 
-                self.update_trajectory(detection)
+                self.update_trajectory(bbox.center, bbox.timestamp)
                 # self.update_status()
 
-                self.start_point = (int(detection.Left), int(detection.Top))
-                self.end_point = (int(detection.Right), int(detection.Bottom))
-                self.center = tuple(map(int, detection.Center))
+                self.start_point = bbox.start_point
+                self.end_point = bbox.end_point
+                self.center = bbox.center
+                self.timestamp = bbox.timestamp
+
+        def update_trajectory(self, actual_center, timestamp=None):
 
-        def update_trajectory(self, detection):
+                """
+                Updates dx dy with the displacement over the memory ring
+                With timestamps dx dy are pixels per second,
+                otherwise pixels per memory_size - 1 frames
+                :param actual_center: tuple, new center
+                :param timestamp: float, capture time of the new center
+                """
 
-                actual_center = tuple(map(int, detection.Center))
-                self.memory.append(actual_center)
+                self.memory[self.samples % self.memory_size] = actual_center
+                self.times[self.samples % self.memory_size] = timestamp if timestamp is not None else 0
+                self.samples += 1
 
-                if len(self.memory) >= self.memory.maxlen:
+                if self.samples >= self.memory_size:
 
-                        prev_center = self.memory[0]
+                        # oldest center on the ring
+                        prev_center = self.memory[self.samples % self.memory_size]
 
-                        dx = actual_center[0] - prev_center[0]
-                        dy = actual_center[1] - prev_center[1]
+                        dx = actual_center[0] - int(prev_center[0])
+                        dy = actual_center[1] - int(prev_center[1])
+
+                        if timestamp is not None:
+                                elapsed = timestamp - self.times[self.samples % self.memory_size]
+                                if elapsed <= 0:
+                                        return
+                                dx /= elapsed
+                                dy /= elapsed
 
                         self.dx += 0.1*(dx - self.dx)
                         self.dy += 0.1*(dy - self.dy)
@@ -70,17 +107,9 @@ class BBox:
 
         def update_status(self):
                 if abs(self.dx) > 1 or abs(self.dy) > 1:
-                        self.color = self.colors[self.name] if self.name in self.colors.keys() else self.colors[
-                                'unknown']
+                        self.color = classes.classesColors.get(self.name, classes.classesColors['unknown'])
                         self.status = 'move'
                 else:
-                        self.color = self.colors['unknown']
+                        self.color = classes.classesColors['unknown']
                         self.status = 'stop'
 
-
-
-
-
-
-
-
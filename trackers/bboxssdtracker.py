@@ -67,8 +67,8 @@ class BBoxTracker:
 
                         # grab the set of object IDs and corresponding centroids
                         objectIDs = list(self.objects.keys())
-                        objectCentroids = np.asarray([bbox.center for bbox in self.objects.values()], dtype=np.int)
-                        inputCentroids = np.asarray([bbox.center for bbox in boundingBoxes], dtype=np.int)
+                        objectCentroids = np.asarray([bbox.center for bbox in self.objects.values()], dtype=int)
+                        inputCentroids = np.asarray([bbox.center for bbox in boundingBoxes], dtype=int)
 
                         # compute the distance between each pair of object
                         # centroids and input centroids, respectively -- our
@@ -1,10 +1,10 @@
 from collections import OrderedDict
-from utils.utils import calculate_intersection_matrix
+from utils.tracking import calculate_intersection_matrix
 
 
 class BBoxTracker:
 
-        def __init__(self, maxDisappeared = 50):
+        def __init__(self, maxDisappeared = 50, maxDistance = None, grid = None, maxAge = None):
                 # initialize the next unique object ID along with two ordered
                 # dictionaries used to keep track of mapping a given object
                 # ID to its centroid and number of consecutive frames it has
@@ -19,11 +19,24 @@ class BBoxTracker:
                 # need to deregister the object from tracking
                 self.maxDisappeared = maxDisappeared
 
+                # seconds an object is allowed to be missing, used instead
+                # of maxDisappeared when update() gets capture timestamps
+                self.maxAge = maxAge
+                # capture timestamp of the last detection of each object
+                self.last_seen = OrderedDict()
+
+                # detections further than maxDistance from a tracked
+                # object are never assigned to it (None: no limit)
+                self.maxDistance = maxDistance
+                # utils.spatial.GridIndex for sparse association in crowds
+                self.grid = grid
+
         def register(self, boundingBox):
                 # when registering an object we use the next available object
                 # ID to store the centroid
                 self.objects[self.nextObjectID] = boundingBox
                 self.disappeared[self.nextObjectID] = 0
+                self.last_seen[self.nextObjectID] = getattr(boundingBox, 'timestamp', None)
                 self.nextObjectID += 1
 
         def deregisterall(self):
@@ -35,8 +48,15 @@ class BBoxTracker:
                 # both of our respective dictionaries
                 del self.objects[objectID]
                 del self.disappeared[objectID]
+                del self.last_seen[objectID]
 
-        def update(self, boundingBoxes):
+        def expired(self, objectID, timestamp):
+                # over maxAge seconds since last seen, or over maxDisappeared frames
+                if self.maxAge is not None and timestamp is not None and self.last_seen[objectID] is not None:
+                        return timestamp - self.last_seen[objectID] > self.maxAge
+                return self.disappeared[objectID] > self.maxDisappeared
+
+        def update(self, boundingBoxes, timestamp = None):
 
                 # Si no recibimos nuevas bounding boxes
                 # Anotamos los objetos como desaparecidos
@@ -48,7 +68,7 @@ class BBoxTracker:
                                 # if we have reached a maximum number of consecutive
                                 # frames where a given object has been marked as
                                 # missing, deregister it
-                                if self.disappeared[objectID] > self.maxDisappeared:
+                                if self.expired(objectID, timestamp):
                                         self.deregister(objectID)
                         return self.objects
 
@@ -67,57 +87,44 @@ class BBoxTracker:
                         objectIDs = list(self.objects.keys())
                         objectbboxes = list(self.objects.values())
 
-                        unused_objects_ids = objectIDs.copy()
-                        unused_detected_idxs = list(range(0, len(boundingBoxes)))
+                        unused_objects_ids = set(objectIDs)
+                        unused_detected_idxs = set(range(0, len(boundingBoxes)))
 
                         # print('Tenemos ' + str(len(objectbboxes)) + ' objetos siendo trackeados')
                         # print('Tenemos ' + str(len(boundingBoxes)) + ' bboxes con las que comparar')
 
-                        matrix = calculate_intersection_matrix(boundingBoxes, objectbboxes)
+                        matrix = calculate_intersection_matrix(boundingBoxes, objectbboxes, self.maxDistance, grid=self.grid)
 
 
                         for tracked, detected in zip(matrix[0], matrix[1]):
 
-                                if tracked == -1:
-                                        continue
-
                                 objectID = objectIDs[tracked]
                                 detectedbbox = boundingBoxes[detected]
   
                                 self.objects[objectID].update(detectedbbox)
                                 self.disappeared[objectID] = 0
+                                self.last_seen[objectID] = getattr(detectedbbox, 'timestamp', None)
 
-                                unused_objects_ids.remove(objectID)
-                                unused_detected_idxs.remove(detected)
+                                unused_objects_ids.discard(objectID)
+                                unused_detected_idxs.discard(detected)
 
 
-                        # in the event that the number of object centroids is
-                        # equal or greater than the number of input centroids
-                        # we need to check and see if some of these objects have
-                       # potentially disappeared
+                        # pairs out of the distance gate are never matched, so there
+                        # may be both tracked objects that have potentially
+                        # disappeared and new detections to register
 
-                        tracked_objects_n = len(objectbboxes)
-                        detected_objects_n = len(boundingBoxes)
-
-                        if tracked_objects_n >= detected_objects_n:
-
-                                for object_id in unused_objects_ids:
-                                        self.disappeared[object_id] += 1
+                        for object_id in sorted(unused_objects_ids):
+                                self.disappeared[object_id] += 1
 
                                 # check to see if the number of consecutive
                                 # frames the object has been marked "disappeared"
                                 # for warrants deregistering the object
-                                        if self.disappeared[object_id] > self.maxDisappeared:
-
-                                                self.deregister(object_id)
+                                if self.expired(object_id, timestamp):
 
-                        # otherwise, if the number of input centroids is greater
-                        # than the number of existing object centroids we need to
-                        # register each new input centroid as a trackable object
-                        else:
+                                        self.deregister(object_id)
 
-                                for new_idx in unused_detected_idxs:
-                                        self.register(boundingBoxes[new_idx])
+                        for new_idx in sorted(unused_detected_idxs):
+                                self.register(boundingBoxes[new_idx])
 
                 # return the set of trackable objects
                 return self.objects
@@ -1,26 +1,37 @@
 import dlib
+from utils import classes
 from _collections import deque
 from numpy import gradient, sum, linalg, array, asarray, less
 from scipy.spatial.distance import cdist
 from scipy.stats import linregress
+from trackers.kalman import KalmanBank
 
 
 class BoundingBox:
 
+        __slots__ = (
+                'status', 'type', 'startX', 'startY', 'endX', 'endY', 'rect', 'prev_rect',
+                'start_point', 'end_point', 'color', 'center', 'mov', 'dx', 'dy', 'kalman'
+        )
+
+        # the box is the only slot of its constant velocity Kalman filter
+        slot = array([0])
+
         def __init__(self, box_points, name='unknown'):
 
-                self.status = "unknown"
+                self.mov = ['unknown', 'unknown']
+                self.kalman = KalmanBank(1)
+                self.reset(box_points, name)
 
+        def reset(self, box_points, name='unknown'):
 
-                self.colors = {
-                        'person': (255, 0, 0),
-                        'car': (0, 255, 0),
-                        'bicycle': (0, 0, 255),
-                        'motorcycle': (255, 255, 0),
-                        'bus': (0, 255, 255),
-                        'truck': (255, 0, 255),
-                        'unknown': (255, 255, 255)
-                }
+                """
+                (Re)initializes the bounding box
+                :param box_points: list, startX startY endX endY
+                :param name: str, class name
+                """
+
+                self.status = "unknown"
 
                 self.type = name
                 self.startX = box_points[0]
@@ -37,12 +48,14 @@ class BoundingBox:
 
                 self.start_point = (self.startX, self.startY)
                 self.end_point = (self.endX, self.endY)
-                self.color = self.colors[self.type]
+                self.color = classes.classesColors.get(self.type, classes.classesColors['unknown'])
                 self.center = self.get_center()
 
-                self.mov = ['unknown', 'unknown']
+                self.mov[0] = 'unknown'
+                self.mov[1] = 'unknown'
                 self.dx = 0
-                self. dy = 0
+                self.dy = 0
+                self.kalman.init(self.slot, [self.center])
 
 
 
@@ -83,14 +96,14 @@ class BoundingBox:
 
         def trajectory(self):
 
-                prev_center = (self.prev_rect.dcenter().x, self.prev_rect.dcenter().y)
-                actual_center = self.get_center()
-
-                dx = actual_center[0] - prev_center[0]
-                dy = actual_center[1] - prev_center[1]
+                """
+                Updates dx dy (pixels per frame) with the Kalman filter of the box,
+                velocity is known from the second observation
+                """
 
-                self.dx += 0.1*(dx - self.dx)
-                self.dy += 0.1*(dy - self.dy)
+                self.kalman.predict(self.slot)
+                self.kalman.correct(self.slot, [self.get_center()])
+                self.dx, self.dy = (float(value) for value in self.kalman.velocities[0])
 
                 self.prev_rect = self.rect
 
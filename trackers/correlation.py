@@ -0,0 +1,143 @@
+from concurrent.futures import ThreadPoolExecutor
+import cv2
+import numpy as np
+from detectors.postprocess import DETECTION_DTYPE
+
+try:
+        import dlib
+except ImportError:
+        # dlib is optional, cv2 trackers are used without it
+        dlib = None
+
+
+class DlibCorrelation:
+
+        """
+        dlib correlation tracker of one box
+        """
+
+        # peak to side lobe ratio under which the target is lost
+        min_quality = 7.0
+
+        def __init__(self):
+                self.tracker = dlib.correlation_tracker()
+
+        def start(self, frame, ltrb):
+                left, top, right, bottom = (int(value) for value in ltrb)
+                self.tracker.start_track(frame, dlib.rectangle(left, top, right, bottom))
+
+        def update(self, frame):
+
+                """
+                :param frame: numpy array
+                :return: tuple (ok, left top right bottom)
+                """
+
+                quality = self.tracker.update(frame)
+                rect = self.tracker.get_position()
+
+                return quality >= self.min_quality, (rect.left(), rect.top(), rect.right(), rect.bottom())
+
+
+class OpenCVCorrelation:
+
+        """
+        cv2 tracker of one box, KCF when available (opencv-contrib), MIL otherwise
+        """
+
+        def __init__(self):
+                self.tracker = None
+
+        @staticmethod
+        def create():
+                for owner in (cv2, getattr(cv2, 'legacy', None)):
+                        if owner is not None and hasattr(owner, 'TrackerKCF_create'):
+                                return owner.TrackerKCF_create()
+                return cv2.TrackerMIL_create()
+
+        def start(self, frame, ltrb):
+                # cv2 trackers can not be restarted
+                self.tracker = self.create()
+                left, top, right, bottom = (int(value) for value in ltrb)
+                self.tracker.init(frame, (left, top, max(1, right - left), max(1, bottom - top)))
+
+        def update(self, frame):
+                ok, (x, y, w, h) = self.tracker.update(frame)
+                return ok, (x, y, x + w, y + h)
+
+
+class CorrelationStage:
+
+        """
+        Propagates the tracks of an ArrayTracker between detector keyframes
+        On a keyframe every live track starts a correlation tracker on its box,
+        on the frames in between each correlation tracker follows its box.
+        Updates run on a thread pool (dlib and cv2 release the GIL)
+        and come back as a detection array to feed the same ArrayTracker,
+        so IDs and Kalman velocities keep running at camera frame rate
+        """
+
+        def __init__(self, backend='dlib', workers=4):
+
+                """
+                :param backend: str, "dlib" or "opencv", dlib falls back to opencv if not installed
+                :param workers: int, threads of the pool
+                """
+
+                if backend == 'dlib' and dlib is None:
+                        backend = 'opencv'
+                self.factory = DlibCorrelation if backend == 'dlib' else OpenCVCorrelation
+                self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='correlation')
+
+                # correlation trackers are reused from keyframe to keyframe
+                self.trackers = []
+                self.class_ids = np.empty(0, dtype=np.int32)
+
+        def __len__(self):
+                return len(self.class_ids)
+
+        def start(self, frame, tracker):
+
+                """
+                Re-syncs with the detector: one correlation tracker per live track
+                :param frame: numpy array, keyframe the tracker was updated with
+                :param tracker: trackers.arraytracker.ArrayTracker
+                """
+
+                # boxes clipped to the frame: cv2 trackers fail on boxes crossing its edges,
+                # boxes left with no area (tracks gone off frame) are not followed
+                slots = tracker.live
+                height, width = frame.shape[:2]
+                boxes = np.clip(tracker.boxes[slots], 0, [width - 1, height - 1, width - 1, height - 1])
+                kept = (boxes[:, 2] > boxes[:, 0] + 1) & (boxes[:, 3] > boxes[:, 1] + 1)
+                boxes = boxes[kept]
+                while len(self.trackers) < len(boxes):
+                        self.trackers.append(self.factory())
+
+                self.class_ids = tracker.class_ids[slots][kept]
+                list(self.pool.map(lambda item: item[0].start(frame, item[1]), zip(self.trackers, boxes)))
+
+        def update(self, frame):
+
+                """
+                Follows every box on a frame without detection
+                :param frame: numpy array
+                :return: structured array of detectors.postprocess.DETECTION_DTYPE, lost boxes left out
+                """
+
+                results = list(self.pool.map(lambda item: item.update(frame), self.trackers[:len(self)]))
+
+                detections = np.zeros(len(results), dtype=DETECTION_DTYPE)
+                if not results:
+                        return detections
+
+                ok = np.array([result[0] for result in results], dtype=bool)
+                detections['class_id'] = self.class_ids
+                detections['ltrb'] = [result[1] for result in results]
+                detections['center'] = (detections['ltrb'][:, :2] + detections['ltrb'][:, 2:]) / 2
+                detections['confidence'] = 1.0
+
+                return detections[ok]
+
+        def close(self):
+                self.pool.shutdown(wait=False)
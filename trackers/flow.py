@@ -0,0 +1,150 @@
+import cv2
+import numpy as np
+
+
+class FlowEstimator:
+
+        """
+        Sparse optical flow velocity of every track of an ArrayTracker
+        A few good features are picked inside each tracked box, and on
+        the next frame all of them are followed with a single
+        calcOpticalFlowPyrLK call over a downscaled grayscale frame,
+        shared by every track. The median flow of each track is
+        fed to its Kalman filter as a velocity observation, so
+        direction is known from the second frame a track is seen
+        """
+
+        def __init__(self, scale=0.5, max_corners=8, win_size=(15, 15), levels=2, noise=0.5):
+
+                """
+                :param scale: float, downscale factor of the flow frame
+                :param max_corners: int, features per track
+                :param win_size: tuple, LK search window on the downscaled frame
+                :param levels: int, pyramid levels
+                :param noise: float, std of the median flow displacement (pixels)
+                """
+
+                self.scale = scale
+                self.max_corners = max_corners
+                self.lk_params = dict(
+                        winSize=win_size, maxLevel=levels,
+                        criteria=(cv2.TERM_CRITERIA_EPS | cv2.TERM_CRITERIA_COUNT, 10, 0.03)
+                )
+                self.noise = noise
+
+                # downscaled gray frames, swapped every update
+                self.full_gray = None
+                self.gray = None
+                self.prev_gray = None
+                self.timestamp = None
+
+                # features of previous frame: points (N, 1, 2), slot and object ID of each point
+                self.points = np.empty((0, 1, 2), dtype=np.float32)
+                self.point_slots = np.empty(0, dtype=np.intp)
+                self.point_ids = np.empty(0, dtype=np.int64)
+
+        def prepare(self, frame):
+
+                """
+                Downscaled grayscale version of frame, on preallocated buffers
+                :param frame: numpy BGR array
+                """
+
+                height, width = frame.shape[:2]
+                size = (max(1, int(width * self.scale)), max(1, int(height * self.scale)))
+                if self.gray is None or self.gray.shape != (size[1], size[0]):
+                        self.gray = np.empty((size[1], size[0]), dtype=np.uint8)
+                        self.prev_gray = None
+                        self.full_gray = np.empty((height, width), dtype=np.uint8)
+
+                if frame.ndim == 3:
+                        cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY, dst=self.full_gray)
+                else:
+                        self.full_gray[:] = frame
+                cv2.resize(self.full_gray, size, dst=self.gray, interpolation=cv2.INTER_AREA)
+
+        def flow(self, tracker, dt):
+
+                """
+                Follows previous features and observes median flow per track
+                :param tracker: trackers.arraytracker.ArrayTracker
+                :param dt: float, time since previous frame (seconds or 1 frame)
+                """
+
+                if self.prev_gray is None or len(self.points) == 0 or dt <= 0:
+                        return
+
+                moved, status, _ = cv2.calcOpticalFlowPyrLK(self.prev_gray, self.gray, self.points, None, **self.lk_params)
+
+                # points followed, on tracks still alive with the same object
+                slots = self.point_slots
+                valid = (status.ravel() == 1) & (tracker.ids[slots] == self.point_ids)
+                if not valid.any():
+                        return
+
+                displacement = (moved - self.points).reshape(-1, 2)[valid] / self.scale
+                slots = slots[valid]
+
+                # median per track, points are grouped by slot
+                order = np.argsort(slots, kind='stable')
+                slots, displacement = slots[order], displacement[order]
+                tracked, starts = np.unique(slots, return_index=True)
+                medians = np.array([np.median(group, axis=0) for group in np.split(displacement, starts[1:])])
+
+                tracker.observe_velocity(tracked, medians / dt, (self.noise / dt) ** 2)
+
+        def pick(self, tracker):
+
+                """
+                Good features inside every live box for the next frame
+                :param tracker: trackers.arraytracker.ArrayTracker
+                """
+
+                points, point_slots = [], []
+                height, width = self.gray.shape
+                for slot in tracker.live:
+                        left, top, right, bottom = np.round(tracker.boxes[slot] * self.scale).astype(int)
+                        left, top = max(0, left), max(0, top)
+                        right, bottom = min(width, right), min(height, bottom)
+                        if right - left < 3 or bottom - top < 3:
+                                continue
+
+                        corners = cv2.goodFeaturesToTrack(self.gray[top:bottom, left:right], self.max_corners, 0.01, 2)
+                        if corners is None:
+                                continue
+                        points.append(corners + np.array([left, top], dtype=np.float32))
+                        point_slots.append(np.full(len(corners), slot, dtype=np.intp))
+
+                if points:
+                        self.points = np.concatenate(points).astype(np.float32)
+                        self.point_slots = np.concatenate(point_slots)
+                else:
+                        self.points = np.empty((0, 1, 2), dtype=np.float32)
+                        self.point_slots = np.empty(0, dtype=np.intp)
+                self.point_ids = tracker.ids[self.point_slots].copy()
+
+        def update(self, frame, tracker, timestamp=None):
+
+                """
+                Observes the flow velocity of the tracks followed since
+                previous frame and picks features for the next one
+                To be called after tracker.update on every frame
+                :param frame: numpy BGR array
+                :param tracker: trackers.arraytracker.ArrayTracker
+                :param timestamp: float, capture time, None counts one frame
+                """
+
+                if timestamp is None:
+                        dt = 1.0
+                else:
+                        dt = 0.0 if self.timestamp is None else timestamp - self.timestamp
+                        self.timestamp = timestamp
+
+                self.prepare(frame)
+                self.flow(tracker, dt)
+                self.pick(tracker)
+
+                # current frame becomes the previous one
+                if self.prev_gray is None:
+                        self.prev_gray = np.empty_like(self.gray)
+                self.gray, self.prev_gray = self.prev_gray, self.gray
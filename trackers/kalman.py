@@ -0,0 +1,133 @@
+import numpy as np
+
+
+class KalmanBank:
+
+        """
+        Constant velocity Kalman filters of every track, batched as matrix ops
+        State per slot: [x, y, vx, vy], measurement: box center [x, y]
+        Velocities are in pixels per time unit of dt
+        """
+
+        # measurement matrix: we observe the position
+        H = np.array([[1, 0, 0, 0], [0, 1, 0, 0]], dtype=np.float64)
+
+        def __init__(self, capacity=64, position_var=10.0, velocity_var=1000.0,
+                     process_var=1.0, measurement_var=4.0):
+
+                """
+                :param capacity: int, number of slots
+                :param position_var: float, initial position variance
+                :param velocity_var: float, initial velocity variance (unknown)
+                :param process_var: float, acceleration noise
+                :param measurement_var: float, detector center noise (pixels^2)
+                """
+
+                self.position_var = position_var
+                self.velocity_var = velocity_var
+                self.process_var = process_var
+                self.R = measurement_var * np.eye(2)
+
+                self.x = np.zeros((capacity, 4))
+                self.P = np.zeros((capacity, 4, 4))
+
+        def grow(self, capacity):
+                extra = capacity - len(self.x)
+                if extra > 0:
+                        self.x = np.concatenate([self.x, np.zeros((extra, 4))])
+                        self.P = np.concatenate([self.P, np.zeros((extra, 4, 4))])
+
+        @property
+        def positions(self):
+                return self.x[:, :2]
+
+        @property
+        def velocities(self):
+                return self.x[:, 2:]
+
+        def init(self, slots, centers):
+
+                """
+                Starts filters at the first observation, velocity unknown
+                :param slots: numpy array of slots
+                :param centers: numpy array (N, 2)
+                """
+
+                self.x[slots, :2] = centers
+                self.x[slots, 2:] = 0
+                self.P[slots] = np.diag([self.position_var, self.position_var, self.velocity_var, self.velocity_var])
+
+        def predict(self, slots, dt=1.0):
+
+                """
+                Advances filters dt time units without observation
+                :param slots: numpy array of slots
+                :param dt: float or numpy array (N,), elapsed time per slot
+                """
+
+                if len(slots) == 0:
+                        return
+
+                dt = np.broadcast_to(np.asarray(dt, dtype=np.float64), (len(slots),))
+
+                # F = [[1, 0, dt, 0], [0, 1, 0, dt], [0, 0, 1, 0], [0, 0, 0, 1]] per slot
+                F = np.tile(np.eye(4), (len(slots), 1, 1))
+                F[:, 0, 2] = dt
+                F[:, 1, 3] = dt
+
+                # white acceleration process noise
+                Q = np.zeros((len(slots), 4, 4))
+                dt2, dt3, dt4 = dt ** 2, dt ** 3 / 2, dt ** 4 / 4
+                for pos, vel in ((0, 2), (1, 3)):
+                        Q[:, pos, pos] = dt4
+                        Q[:, pos, vel] = Q[:, vel, pos] = dt3
+                        Q[:, vel, vel] = dt2
+                Q *= self.process_var
+
+                self.x[slots] = np.einsum('nij,nj->ni', F, self.x[slots])
+                self.P[slots] = F @ self.P[slots] @ F.transpose(0, 2, 1) + Q
+
+        def correct(self, slots, centers):
+
+                """
+                Updates filters with observed centers
+                :param slots: numpy array of slots
+                :param centers: numpy array (N, 2)
+                """
+
+                if len(slots) == 0:
+                        return
+
+                x = self.x[slots]
+                P = self.P[slots]
+
+                innovation = centers - x[:, :2]
+                # S = H P H^T + R, K = P H^T S^-1
+                S = P[:, :2, :2] + self.R
+                K = P[:, :, :2] @ np.linalg.inv(S)
+
+                self.x[slots] = x + np.einsum('nij,nj->ni', K, innovation)
+                self.P[slots] = P - K @ P[:, :2, :]
+
+        def correct_velocity(self, slots, velocities, variance):
+
+                """
+                Updates filters with observed velocities (e.g. optical flow)
+                :param slots: numpy array of slots
+                :param velocities: numpy array (N, 2)
+                :param variance: float or numpy array (N,), measurement variance
+                """
+
+                if len(slots) == 0:
+                        return
+
+                x = self.x[slots]
+                P = self.P[slots]
+
+                innovation = velocities - x[:, 2:]
+                variance = np.broadcast_to(np.asarray(variance, dtype=np.float64), (len(slots),))
+                S = P[:, 2:, 2:] + variance[:, None, None] * np.eye(2)
+                K = P[:, :, 2:] @ np.linalg.inv(S)
+
+                self.x[slots] = x + np.einsum('nij,nj->ni', K, innovation)
+                self.P[slots] = P - K @ P[:, 2:, :]
@@ -0,0 +1,166 @@
+from collections import OrderedDict
+import cv2
+import numpy as np
+from utils.association import center_distance_matrix, sparse_assignment
+
+
+def hsv_descriptors(frame, boxes, bins=(8, 4), size=(8, 16)):
+
+        """
+        Hue-saturation histograms of a batch of boxes
+        Every box is sampled on a size grid by one fancy index of the frame
+        (nearest neighbour), all patches are converted to HSV in one call
+        and histogrammed in one bincount
+        :param frame: numpy BGR array
+        :param boxes: numpy array (N, 4), left top right bottom
+        :param bins: tuple, hue and saturation bins
+        :param size: tuple, patch width and height
+        :return: numpy float32 array (N, hue bins * saturation bins), rows sum 1
+        """
+
+        boxes = np.asarray(boxes, dtype=np.float64).reshape(-1, 4)
+        n = len(boxes)
+        n_bins = bins[0] * bins[1]
+        if n == 0:
+                return np.empty((0, n_bins), dtype=np.float32)
+
+        height, width = frame.shape[:2]
+        left, right = np.clip(boxes[:, 0], 0, width - 1), np.clip(boxes[:, 2], 0, width)
+        top, bottom = np.clip(boxes[:, 1], 0, height - 1), np.clip(boxes[:, 3], 0, height)
+
+        # pixel centers of a size grid inside every box, (N, w) and (N, h)
+        steps_x = (np.arange(size[0]) + 0.5) / size[0]
+        steps_y = (np.arange(size[1]) + 0.5) / size[1]
+        xs = left[:, None] + np.maximum(right - left, 1)[:, None] * steps_x[None, :]
+        ys = top[:, None] + np.maximum(bottom - top, 1)[:, None] * steps_y[None, :]
+        xs = np.minimum(xs.astype(np.intp), width - 1)
+        ys = np.minimum(ys.astype(np.intp), height - 1)
+        patches = frame[ys[:, :, None], xs[:, None, :]]
+
+        # all patches stacked as one image
+        hsv = cv2.cvtColor(patches.reshape(n * size[1], size[0], 3), cv2.COLOR_BGR2HSV).reshape(n, -1, 3)
+        hue = hsv[:, :, 0].astype(np.intp) * bins[0] // 180
+        saturation = hsv[:, :, 1].astype(np.intp) * bins[1] // 256
+
+        index = np.arange(n)[:, None] * n_bins + hue * bins[1] + saturation
+        histograms = np.bincount(index.ravel(), minlength=n * n_bins).reshape(n, n_bins)
+
+        return (histograms / (size[0] * size[1])).astype(np.float32)
+
+
+def hellinger_matrix(descriptorsA, descriptorsB):
+
+        """
+        Hellinger distance between every pair of histograms
+        :param descriptorsA: numpy array (N, D), rows sum 1
+        :param descriptorsB: numpy array (M, D), rows sum 1
+        :return: numpy array (N, M), values in [0, 1]
+        """
+
+        coefficients = np.sqrt(descriptorsA) @ np.sqrt(descriptorsB).T
+
+        return np.sqrt(np.clip(1 - coefficients, 0, None))
+
+
+class ReIDCache:
+
+        """
+        Bounded store of recently lost tracks for re-identification
+        Tracks expired by a tracker are kept with their appearance
+        descriptor and tracker state, least recently lost first out,
+        and dropped after ttl. New detections close to the position
+        where a lost track was (or would be) and looking alike
+        take back its ID and history instead of starting a new track
+        """
+
+        def __init__(self, capacity=32, ttl=5.0, max_distance=0.35, max_shift=150, bins=(8, 4)):
+
+                """
+                :param capacity: int, max number of lost tracks kept
+                :param ttl: float, time lost tracks are kept (tracker time units: seconds or frames)
+                :param max_distance: float, max Hellinger distance of a match
+                :param max_shift: float, max pixels between a detection and the last
+                                  or predicted position of a lost track
+                :param bins: tuple, hue and saturation bins of the descriptors
+                """
+
+                self.capacity = capacity
+                self.ttl = ttl
+                self.max_distance = max_distance
+                self.max_shift = max_shift
+                self.bins = bins
+                self.size = bins[0] * bins[1]
+
+                # object ID -> (tracker state, lost time)
+                self.lost = OrderedDict()
+
+                # matches since start
+                self.revived = 0
+
+        def __len__(self):
+                return len(self.lost)
+
+        def describe(self, frame, boxes):
+                return hsv_descriptors(frame, boxes, self.bins)
+
+        def add(self, object_id, state, now):
+
+                """
+                Keeps a lost track, dropping the oldest one when full
+                :param object_id: int
+                :param state: dict, tracker state of the track with its
+                              'descriptor' and Kalman state 'x' (see ArrayTracker.state)
+                :param now: float, time the track was lost
+                """
+
+                self.lost[object_id] = (state, now)
+                self.lost.move_to_end(object_id)
+                while len(self.lost) > self.capacity:
+                        self.lost.popitem(last=False)
+
+        def expire(self, now):
+                while self.lost:
+                        object_id, (_, lost_at) = next(iter(self.lost.items()))
+                        if now - lost_at <= self.ttl:
+                                break
+                        del self.lost[object_id]
+
+        def match(self, descriptors, centers, now):
+
+                """
+                Matches new detections to lost tracks and takes them out of the cache
+                :param descriptors: numpy array (N, D), descriptors of the detections
+                :param centers: numpy array (N, 2), centers of the detections
+                :param now: float, current time
+                :return: matched detection indexes, list of (object ID, state, lost time)
+                """
+
+                self.expire(now)
+                if not self.lost or len(descriptors) == 0:
+                        return np.empty(0, dtype=np.intp), []
+
+                object_ids = list(self.lost.keys())
+                entries = list(self.lost.values())
+                lost_descriptors = np.array([entry[0]['descriptor'] for entry in entries])
+                # last and constant velocity predicted position of every lost track
+                states = np.array([entry[0]['x'] for entry in entries])
+                elapsed = np.array([now - entry[1] for entry in entries])
+                predicted = states[:, :2] + states[:, 2:] * elapsed[:, None]
+
+                shift = np.minimum(
+                        center_distance_matrix(states[:, :2], centers),
+                        center_distance_matrix(predicted, centers)
+                )
+                distances = hellinger_matrix(lost_descriptors, descriptors)
+
+                rows, cols = np.nonzero((distances <= self.max_distance) & (shift <= self.max_shift))
+                rows, cols = sparse_assignment(len(object_ids), len(descriptors), rows, cols, distances[rows, cols])
+
+                matches = []
+                for row in rows:
+                        object_id = object_ids[row]
+                        state, lost_at = self.lost.pop(object_id)
+                        matches.append((object_id, state, lost_at))
+                self.revived += len(matches)
+
+                return cols, matches
@@ -0,0 +1,189 @@
+from collections import OrderedDict
+import numpy as np
+from utils.tracking import are_moving_in_direction
+from trackers.arraytracker import ArrayTracker, TrackView
+
+
+class ZoneTrackView(TrackView):
+
+        """
+        TrackView with the zones of the track
+        """
+
+        __slots__ = ()
+
+        @property
+        def zones(self):
+                return self.tracker.zone_names(self.tracker.zone_bits[self.slot])
+
+        @property
+        def history(self):
+                return self.tracker.zone_history(self.slot)
+
+
+class ZoneTracker(ArrayTracker):
+
+        """
+        Single tracker for a camera with several zones
+        Every detection is associated once, whatever zones it is in,
+        and every track keeps the bitmask of its current zones
+        (utils.zones.ZoneMask bits) and a short history of zone
+        transitions, so an object walking from one zone to another
+        keeps its ID and direction queries are asked per zone
+        """
+
+        view = ZoneTrackView
+
+        # zone transitions kept per track
+        history_size = 8
+
+        def __init__(self, zones=None, maxDisappeared=50, capacity=64, maxDistance=None, minIoU=0.0, grid=None, maxAge=None, reid=None):
+
+                """
+                :param zones: utils.zones.ZoneMask, can be set later
+                other params as in ArrayTracker
+                """
+
+                self.zones = zones
+
+                # current zone bits, and ring of (zone bits, timestamp) transitions
+                self.zone_bits = np.empty(0, dtype=np.uint8)
+                self.history_bits = np.empty((0, self.history_size), dtype=np.uint8)
+                self.history_times = np.empty((0, self.history_size), dtype=np.float64)
+                self.history_count = np.empty(0, dtype=np.int64)
+
+                super().__init__(maxDisappeared, capacity, maxDistance, minIoU, grid, maxAge, reid)
+
+        def grow(self, capacity):
+
+                extra = capacity - self.capacity
+                super().grow(capacity)
+                if extra <= 0:
+                        return
+
+                self.zone_bits = np.concatenate([self.zone_bits, np.zeros(extra, dtype=np.uint8)])
+                self.history_bits = np.concatenate([self.history_bits, np.zeros((extra, self.history_size), dtype=np.uint8)])
+                self.history_times = np.concatenate([self.history_times, np.zeros((extra, self.history_size))])
+                self.history_count = np.concatenate([self.history_count, np.zeros(extra, dtype=np.int64)])
+
+        def labels(self, centers):
+                if self.zones is None:
+                        return np.zeros(len(centers), dtype=np.uint8)
+                return self.zones.labels(centers)
+
+        def zone_names(self, bits):
+
+                """
+                :param bits: int, zone bitmask
+                :return: list of str, names of the zones on bits
+                """
+
+                if self.zones is None:
+                        return []
+                return [name for name in self.zones.names if bits & self.zones.bits[name]]
+
+        def record(self, slots, bits, timestamp):
+
+                """
+                Stores a zone transition of every slot
+                :param slots: numpy array of slots
+                :param bits: numpy uint8 array, new zone bits of every slot
+                :param timestamp: float, capture time, None stores nan
+                """
+
+                position = self.history_count[slots] % self.history_size
+                self.history_bits[slots, position] = bits
+                self.history_times[slots, position] = np.nan if timestamp is None else timestamp
+                self.history_count[slots] += 1
+                self.zone_bits[slots] = bits
+
+        def zone_history(self, slot):
+
+                """
+                Zone transitions of one track, oldest first
+                The first entry are the zones where it was first seen
+                :param slot: int, slot of the track
+                :return: list of tuples (list of zone names, timestamp)
+                """
+
+                count = int(self.history_count[slot])
+                positions = np.arange(max(0, count - self.history_size), count) % self.history_size
+
+                return [
+                        (self.zone_names(self.history_bits[slot, position]), float(self.history_times[slot, position]))
+                        for position in positions
+                ]
+
+        def register(self, detections, timestamp=None):
+                slots = super().register(detections, timestamp)
+                self.history_count[slots] = 0
+                self.record(slots, self.labels(detections['center']), timestamp)
+
+                return slots
+
+        def state(self, slot):
+                state = super().state(slot)
+                state['zone_bits'] = int(self.zone_bits[slot])
+                state['history_bits'] = self.history_bits[slot].copy()
+                state['history_times'] = self.history_times[slot].copy()
+                state['history_count'] = int(self.history_count[slot])
+
+                return state
+
+        def restore(self, slot, state):
+                super().restore(slot, state)
+                self.zone_bits[slot] = state['zone_bits']
+                self.history_bits[slot] = state['history_bits']
+                self.history_times[slot] = state['history_times']
+                self.history_count[slot] = state['history_count']
+
+        def move(self, slots, detections, timestamp=None):
+                super().move(slots, detections, timestamp)
+                bits = self.labels(detections['center'])
+                changed = bits != self.zone_bits[slots]
+                self.record(slots[changed], bits[changed], timestamp)
+
+        def in_zone(self, name):
+
+                """
+                Live tracks currently in one zone
+                :param name: str, zone name
+                :return: numpy array of slots, ordered by object ID
+                """
+
+                live = self.live
+                if self.zones is None:
+                        return live[:0]
+                return live[(self.zone_bits[live] & self.zones.bits[name]) != 0]
+
+        def objects_in_zone(self, name):
+
+                """
+                Dict of objects view of the tracks in one zone
+                :param name: str, zone name
+                :return: OrderedDict, object ID -> ZoneTrackView
+                """
+
+                return OrderedDict(
+                        (int(self.ids[slot]), self.view(self, slot)) for slot in self.in_zone(name)
+                )
+
+        def moving_in_direction(self, name, direction, min_speed=0.0, max_ratio=10):
+
+                """
+                Tracks of one zone moving in direction, same rules as
+                utils.tracking.is_any_bbox_moving_in_direction
+                :param name: str, zone name
+                :param direction: str, "up", "down, "left" or "right"
+                :param min_speed: float, min speed along direction (pixels per second with maxAge)
+                :param max_ratio: float, max horizontal / vertical speed ratio
+                :return: numpy array of slots
+                """
+
+                slots = self.in_zone(name)
+                slots = slots[self.has_velocity[slots]]
+
+                return slots[are_moving_in_direction(self.velocities[slots], direction, min_speed, max_ratio)]
+
+        def is_any_moving_in_direction(self, name, direction, min_speed=0.0, max_ratio=10):
+                return len(self.moving_in_direction(name, direction, min_speed, max_ratio)) > 0
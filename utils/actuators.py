@@ -0,0 +1,383 @@
+import queue
+import threading
+import time
+from collections import deque
+import numpy as np
+
+
+class Driver:
+
+    """
+    Warning output interface
+    open() and write() run on the worker thread of the driver,
+    so slow devices never block the detection loop
+    """
+
+    name = 'driver'
+
+    def open(self):
+        pass
+
+    def write(self, state):
+
+        """
+        :param state: bool, True turns warnings on
+        """
+
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class GPIODriver(Driver):
+
+    """
+    Jetson GPIO pin
+    """
+
+    name = 'gpio'
+
+    def __init__(self, pin=18):
+        self.pin = pin
+
+    def open(self):
+        from utils import gpios
+        self.gpios = gpios
+        gpios.activate_jetson_board()
+
+    def write(self, state):
+        if state:
+            self.gpios.warning_ON(self.pin)
+        else:
+            self.gpios.warning_OFF(self.pin)
+
+    def close(self):
+        self.gpios.deactivate_jetson_board()
+
+
+class ArduinoDriver(Driver):
+
+    """
+    USB serial arduino, 'H' turns warnings on and 'L' off
+    """
+
+    name = 'arduino'
+
+    def __init__(self, port="/dev/ttyACM0", baudrate=9600, boot_time=2):
+        self.port = port
+        self.baudrate = baudrate
+        self.boot_time = boot_time
+        self.board = None
+
+    def open(self):
+        from utils.arduino import arduino
+        # waits for the board to boot, on the worker thread
+        self.board = arduino(self.port, self.baudrate, self.boot_time)
+
+    def write(self, state):
+        if state:
+            self.board.turn_on_arduino()
+        else:
+            self.board.turn_off_arduino()
+        self.board.ser.flush()
+
+    def close(self):
+        if self.board is not None:
+            self.board.close()
+            self.board = None
+
+
+class LoopbackDriver(Driver):
+
+    """
+    Local driver for tests and machines without outputs
+    Keeps the last writes in memory and appends them to a file if given
+    """
+
+    name = 'loopback'
+
+    def __init__(self, path=None, delay=0.0, history=1000):
+
+        """
+        :param path: str, file where writes are logged, None keeps them in memory only
+        :param delay: float, seconds every write takes, to mimic slow devices
+        :param history: int, writes kept in memory
+        """
+
+        self.path = path
+        self.delay = delay
+        self.writes = deque([], maxlen=history)
+        self.file = None
+
+    def open(self):
+        if self.path is not None:
+            self.file = open(self.path, 'a')
+
+    def write(self, state):
+        if self.delay:
+            time.sleep(self.delay)
+        self.writes.append((time.monotonic(), state))
+        if self.file is not None:
+            self.file.write("{:.6f} {}\n".format(time.time(), 'ON' if state else 'OFF'))
+            self.file.flush()
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+
+class ActuatorWorker(threading.Thread):
+
+    """
+    Feeds one driver from a queue on its own thread
+    The driver is opened as soon as the worker starts (e.g. GPIO pins set LOW).
+    Commands waiting on the queue are coalesced into the latest one, and a
+    command that fails to write is kept and retried with exponential backoff
+    (reopening the driver) until it is written or replaced by a newer one,
+    so outputs never stay in a stale state. The latency from submit to write
+    is measured and every acknowledged write is reported to
+    listener(driver name, state, origin, ack time)
+    """
+
+    def __init__(self, driver, retries=3, backoff=0.05, max_backoff=2.0, max_latency=0.1, samples=1000, listener=None):
+
+        """
+        :param driver: Driver
+        :param retries: int, attempts left to a failing command when the worker is stopped
+        :param backoff: float, seconds before the first retry, doubled every retry
+        :param max_backoff: float, max seconds between retries
+        :param max_latency: float, latency budget in seconds, overruns are counted
+        :param samples: int, latencies kept for the stats
+        :param listener: callable, e.g. utils.latency.LatencyMonitor.ack
+        """
+
+        super().__init__(name=driver.name + '-actuator', daemon=True)
+        self.driver = driver
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.max_latency = max_latency
+        self.listener = listener
+        self.commands = queue.Queue()
+        self.opened = False
+        # last state written, None before the first write
+        self.state = None
+        # command not written yet, kept until written or replaced
+        self.pending = None
+
+        self.latencies = deque([], maxlen=samples)
+        self.written = 0
+        self.coalesced = 0
+        self.failures = 0
+        self.overruns = 0
+
+    def submit(self, state, submitted=None, origin=None):
+
+        """
+        Queues a command, never blocks
+        :param state: bool, True turns warnings on
+        :param submitted: float, time.monotonic the command was decided, now if None
+        :param origin: utils.latency.Origin, passed to the listener on ack
+        """
+
+        self.commands.put_nowait((state, submitted if submitted is not None else time.monotonic(), origin))
+
+    def open(self):
+        try:
+            self.driver.open()
+            self.opened = True
+        except Exception as error:
+            # opened again on the next write
+            print("{} actuator failed to open: {}".format(self.driver.name, error))
+
+    def attempt(self, state):
+
+        """
+        Writes state once, opening the driver if needed
+        :return: bool, True if written
+        """
+
+        try:
+            if not self.opened:
+                self.driver.open()
+                self.opened = True
+            self.driver.write(state)
+            return True
+        except Exception as error:
+            print("{} actuator failed: {}".format(self.driver.name, error))
+            self.failures += 1
+            if self.opened:
+                try:
+                    self.driver.close()
+                except Exception:
+                    pass
+                self.opened = False
+
+        return False
+
+    def acknowledge(self, state, submitted, origin):
+        acked = time.monotonic()
+        if self.listener is not None:
+            self.listener(self.driver.name, state, origin, acked)
+
+        self.state = state
+        latency = acked - submitted
+        self.latencies.append(latency)
+        self.written += 1
+        if latency > self.max_latency:
+            self.overruns += 1
+
+    def take(self, timeout=None):
+
+        """
+        Latest command on the queue, older ones are coalesced
+        :param timeout: float, seconds to wait for a command, None waits until one comes
+        :return: command or None if none came, and True if stop was asked
+        """
+
+        try:
+            commands = [self.commands.get(timeout=timeout)]
+        except queue.Empty:
+            return None, False
+        while True:
+            try:
+                commands.append(self.commands.get_nowait())
+            except queue.Empty:
+                break
+
+        # None asks to stop, once pending commands are written
+        stopping = None in commands
+        commands = [command for command in commands if command is not None]
+        self.coalesced += max(0, len(commands) - 1)
+
+        return (commands[-1] if commands else None), stopping
+
+    def write_pending(self):
+
+        """
+        Tries to write the pending command once
+        :return: bool, True if nothing is left pending
+        """
+
+        if self.pending is not None and self.pending[0] != self.state:
+            if not self.attempt(self.pending[0]):
+                return False
+            self.acknowledge(*self.pending)
+        self.pending = None
+
+        return True
+
+    def run(self):
+        self.open()
+
+        retry = 0
+        while True:
+            # wait for a command, or until the pending one is retried
+            delay = None if self.pending is None else min(self.backoff * 2 ** retry, self.max_backoff)
+            command, stopping = self.take(delay)
+            if command is not None:
+                if self.pending is not None:
+                    # replaced before being written
+                    self.coalesced += 1
+                self.pending = command
+                retry = 0
+            elif self.pending is not None:
+                retry += 1
+
+            if stopping:
+                for retry in range(self.retries + 1):
+                    if self.write_pending():
+                        break
+                    if retry < self.retries:
+                        time.sleep(min(self.backoff * 2 ** retry, self.max_backoff))
+                break
+
+            self.write_pending()
+
+        if self.opened:
+            self.driver.close()
+
+    def stop(self, timeout=1):
+        self.commands.put_nowait(None)
+        self.join(timeout)
+
+    def stats(self):
+
+        """
+        :return: dict, writes, coalesced, failures, budget overruns
+                 and latency percentiles in milliseconds
+        """
+
+        latencies = np.array(self.latencies) * 1000
+        p50, p95, worst = (float(value) for value in np.percentile(latencies, [50, 95, 100])) if len(latencies) else (0.0, 0.0, 0.0)
+
+        return {
+            'written': self.written, 'coalesced': self.coalesced, 'failures': self.failures,
+            'overruns': self.overruns, 'p50_ms': p50, 'p95_ms': p95, 'max_ms': worst
+        }
+
+
+class ActuatorBank:
+
+    """
+    One warning driving several outputs, each through its own ActuatorWorker
+    on / off are cheap and non-blocking, to be used as AlertController actions
+    """
+
+    def __init__(self, drivers, **worker_params):
+        self.workers = [ActuatorWorker(driver, **worker_params) for driver in drivers]
+        for worker in self.workers:
+            worker.start()
+
+    def set(self, state, origin=None):
+        submitted = time.monotonic()
+        for worker in self.workers:
+            worker.submit(state, submitted, origin)
+
+    def on(self, origin=None):
+        self.set(True, origin)
+
+    def off(self, origin=None):
+        self.set(False, origin)
+
+    def stats(self):
+        return {worker.driver.name: worker.stats() for worker in self.workers}
+
+    def summary(self):
+
+        """
+        :return: str, one line of latency stats per driver
+        """
+
+        return ", ".join(
+            "{} p95 {:.1f} ms ({} fail)".format(name, stats['p95_ms'], stats['failures'])
+            for name, stats in self.stats().items()
+        )
+
+    def close(self):
+
+        """
+        Writes pending commands and closes every driver
+        """
+
+        for worker in self.workers:
+            worker.stop()
+
+
+def make_driver(name):
+
+    """
+    :param name: str, "gpio", "arduino" or "loopback"
+    :return: Driver with default settings
+    """
+
+    if name == 'gpio':
+        return GPIODriver()
+    if name == 'arduino':
+        return ArduinoDriver()
+    if name == 'loopback':
+        return LoopbackDriver()
+
+    raise Exception("Unknown actuator driver: {}".format(name))
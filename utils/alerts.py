@@ -0,0 +1,172 @@
+import heapq
+import itertools
+import threading
+import time
+
+
+class DeadlineScheduler:
+
+    """
+    Single long lived thread running callbacks at their deadlines
+    Deadlines live on a heap, scheduling and cancelling never
+    creates threads (unlike one threading.Timer per call)
+    """
+
+    def __init__(self, name='alert-scheduler'):
+        self.heap = []
+        # handles still on the heap, and those of them cancelled
+        self.scheduled = set()
+        self.cancelled = set()
+        self.counter = itertools.count()
+        self.condition = threading.Condition()
+        self.running = True
+        self.thread = threading.Thread(target=self.run, name=name, daemon=True)
+        self.thread.start()
+
+    def schedule(self, delay, callback, *args):
+
+        """
+        Runs callback(handle, *args) on the scheduler thread after delay seconds
+        :param delay: float, seconds
+        :param callback: callable, gets its own handle first
+        :return: int, handle to cancel it
+        """
+
+        handle = next(self.counter)
+        with self.condition:
+            heapq.heappush(self.heap, (time.monotonic() + delay, handle, callback, args))
+            self.scheduled.add(handle)
+            self.condition.notify()
+
+        return handle
+
+    def cancel(self, handle):
+        # handles already run (or running) can not be cancelled
+        with self.condition:
+            if handle in self.scheduled:
+                self.cancelled.add(handle)
+
+    def run(self):
+        while True:
+            with self.condition:
+                while self.running and (not self.heap or self.heap[0][0] > time.monotonic()):
+                    timeout = self.heap[0][0] - time.monotonic() if self.heap else None
+                    self.condition.wait(timeout)
+                if not self.running:
+                    return
+                _, handle, callback, args = heapq.heappop(self.heap)
+                self.scheduled.discard(handle)
+                if handle in self.cancelled:
+                    self.cancelled.discard(handle)
+                    continue
+            callback(handle, *args)
+
+    def stop(self):
+        with self.condition:
+            self.running = False
+            self.condition.notify()
+        self.thread.join(timeout=1)
+
+
+class AlertController:
+
+    """
+    Warning state machine with hysteresis
+    OFF -> ON when risk reaches on_threshold, ON -> HOLD when it drops
+    under off_threshold, HOLD -> OFF after hold_time unless risk comes
+    back (HOLD -> ON). Actuator calls are edge triggered: on_action
+    only on OFF -> ON and off_action only on HOLD -> OFF
+    """
+
+    OFF = 'OFF'
+    ON = 'ON'
+    HOLD = 'HOLD'
+
+    def __init__(self, on_action, off_action, hold_time=5.0, on_threshold=0.5, off_threshold=None, scheduler=None):
+
+        """
+        :param on_action: callable, turns warnings on
+        :param off_action: callable, turns warnings off
+        :param hold_time: float, seconds warnings stay on after risk drops
+        :param on_threshold: float, risk turning warnings on
+        :param off_threshold: float, risk under which warnings start holding, defaults to on_threshold
+        :param scheduler: DeadlineScheduler, a new one is started if None
+        """
+
+        self.on_action = on_action
+        self.off_action = off_action
+        self.hold_time = hold_time
+        self.on_threshold = on_threshold
+        self.off_threshold = on_threshold if off_threshold is None else off_threshold
+        self.scheduler = scheduler if scheduler is not None else DeadlineScheduler()
+
+        self.state = self.OFF
+        # what the last update was computed from (e.g. utils.latency.Origin)
+        # readable by the actions when they are called
+        self.origin = None
+        self.lock = threading.Lock()
+        # pending HOLD -> OFF deadline
+        self.pending = None
+        # number of actuator calls since start
+        self.switches = 0
+
+    @property
+    def active(self):
+
+        """
+        True while warnings are on (ON or HOLD)
+        """
+
+        return self.state != self.OFF
+
+    def update(self, risk, origin=None):
+
+        """
+        Feeds the risk of a frame, cheap when the state does not change
+        :param risk: float, current risk score
+        :param origin: anything identifying where risk comes from, kept on self.origin
+        :return: str, state
+        """
+
+        with self.lock:
+            self.origin = origin
+            if risk >= self.on_threshold:
+                if self.state == self.OFF:
+                    self.switches += 1
+                    self.on_action()
+                elif self.state == self.HOLD:
+                    self.scheduler.cancel(self.pending)
+                    self.pending = None
+                self.state = self.ON
+
+            elif risk < self.off_threshold and self.state == self.ON:
+                self.state = self.HOLD
+                self.pending = self.scheduler.schedule(self.hold_time, self.expire)
+
+            return self.state
+
+    def expire(self, handle):
+        # runs on the scheduler thread, deadlines replaced or cancelled
+        # after being popped from the scheduler are stale
+        with self.lock:
+            if self.state != self.HOLD or handle != self.pending:
+                return
+            self.state = self.OFF
+            self.pending = None
+            self.switches += 1
+            self.off_action()
+
+    def close(self):
+
+        """
+        Turns warnings off if needed and stops the scheduler
+        """
+
+        with self.lock:
+            if self.pending is not None:
+                self.scheduler.cancel(self.pending)
+                self.pending = None
+            if self.state != self.OFF:
+                self.state = self.OFF
+                self.off_action()
+        self.scheduler.stop()
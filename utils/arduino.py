@@ -10,10 +10,11 @@ class arduino():
     ser = None
 
 
-    def __init__(self):
-        self.ser = serial.Serial("/dev/ttyACM0", 9600)
+    def __init__(self, port="/dev/ttyACM0", baudrate=9600, boot_time=2):
+        self.ser = serial.Serial(port, baudrate)
         print('conecting to arduino')
-        time.sleep(2)
+        # board resets on connection
+        time.sleep(boot_time)
 
     def turn_on_arduino(self):
         self.ser.write(b'H')
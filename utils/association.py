@@ -0,0 +1,210 @@
+from scipy.optimize import linear_sum_assignment
+from scipy.sparse import coo_matrix
+from scipy.sparse.csgraph import connected_components
+import numpy as np
+
+
+def box_centers(boxes):
+
+    """
+    Centers of a batch of boxes
+    :param boxes: numpy array (N, 4), left top right bottom
+    :return: numpy array (N, 2)
+    """
+
+    boxes = np.asarray(boxes, dtype=np.float64).reshape(-1, 4)
+    return (boxes[:, :2] + boxes[:, 2:]) / 2
+
+
+def center_distance_matrix(centersA, centersB):
+
+    """
+    Euclidean distance between every pair of centers
+    :param centersA: numpy array (N, 2)
+    :param centersB: numpy array (M, 2)
+    :return: numpy array (N, M)
+    """
+
+    centersA = np.asarray(centersA, dtype=np.float64).reshape(-1, 2)
+    centersB = np.asarray(centersB, dtype=np.float64).reshape(-1, 2)
+    delta = centersA[:, None, :] - centersB[None, :, :]
+
+    return np.sqrt((delta ** 2).sum(axis=2))
+
+
+def pairwise_iou(boxesA, boxesB):
+
+    """
+    Intersection over union of boxes pair by pair
+    (any shapes broadcasting to each other, last axis left top right bottom)
+    :param boxesA: numpy array (..., 4)
+    :param boxesB: numpy array (..., 4)
+    :return: numpy array (...), values in [0, 1]
+    """
+
+    # intersection rectangle of every pair
+    left = np.maximum(boxesA[..., 0], boxesB[..., 0])
+    top = np.maximum(boxesA[..., 1], boxesB[..., 1])
+    right = np.minimum(boxesA[..., 2], boxesB[..., 2])
+    bottom = np.minimum(boxesA[..., 3], boxesB[..., 3])
+    inter = np.clip(right - left, 0, None) * np.clip(bottom - top, 0, None)
+
+    areaA = (boxesA[..., 2] - boxesA[..., 0]) * (boxesA[..., 3] - boxesA[..., 1])
+    areaB = (boxesB[..., 2] - boxesB[..., 0]) * (boxesB[..., 3] - boxesB[..., 1])
+    union = areaA + areaB - inter
+
+    return np.divide(inter, union, out=np.zeros_like(inter), where=union > 0)
+
+
+def iou_matrix(boxesA, boxesB):
+
+    """
+    Intersection over union between every pair of boxes
+    :param boxesA: numpy array (N, 4), left top right bottom
+    :param boxesB: numpy array (M, 4), left top right bottom
+    :return: numpy array (N, M), values in [0, 1]
+    """
+
+    boxesA = np.asarray(boxesA, dtype=np.float64).reshape(-1, 4)
+    boxesB = np.asarray(boxesB, dtype=np.float64).reshape(-1, 4)
+
+    return pairwise_iou(boxesA[:, None, :], boxesB[None, :, :])
+
+
+def cost_matrix(distances, ious, max_distance, iou_weight=0.5):
+
+    """
+    Combined association cost, lower is better
+    :param distances: numpy array (N, M), center distances
+    :param ious: numpy array (N, M), intersection over union
+    :param max_distance: float, distance normalizing the distance term
+    :param iou_weight: float in [0, 1], weight of the IoU term
+    :return: numpy array (N, M)
+    """
+
+    return (1 - iou_weight) * distances / max_distance + iou_weight * (1 - ious)
+
+
+def sparse_assignment(n_rows, n_cols, rows, cols, costs):
+
+    """
+    Minimum cost assignment over a sparse set of allowed pairs
+    The bipartite graph of allowed pairs is split in connected
+    components and linear_sum_assignment runs on each of them,
+    so the cost follows real neighbourhoods instead of N x M
+    :param n_rows: int, number of rows (tracks)
+    :param n_cols: int, number of columns (detections)
+    :param rows: numpy array, row of every allowed pair
+    :param cols: numpy array, column of every allowed pair
+    :param costs: numpy array, cost of every allowed pair
+    :return: matched rows, matched columns
+    """
+
+    rows = np.asarray(rows, dtype=np.intp)
+    cols = np.asarray(cols, dtype=np.intp)
+    costs = np.asarray(costs, dtype=np.float64)
+
+    if len(rows) == 0:
+        return np.empty(0, dtype=np.intp), np.empty(0, dtype=np.intp)
+
+    # rows are nodes [0, n_rows), columns are nodes [n_rows, n_rows + n_cols)
+    nodes = n_rows + n_cols
+    graph = coo_matrix((np.ones(len(rows)), (rows, cols + n_rows)), shape=(nodes, nodes))
+    _, labels = connected_components(graph, directed=False)
+
+    # group pairs by component
+    pair_labels = labels[rows]
+    order = np.argsort(pair_labels, kind='stable')
+    splits = np.flatnonzero(np.diff(pair_labels[order])) + 1
+
+    # any value over the sum of all costs keeps forbidden pairs out
+    forbidden = costs.sum() + 1
+
+    matched_rows = []
+    matched_cols = []
+    for group in np.split(order, splits):
+
+        # single pair: nothing to solve
+        if len(group) == 1:
+            matched_rows.append(rows[group])
+            matched_cols.append(cols[group])
+            continue
+
+        component_rows, row_idx = np.unique(rows[group], return_inverse=True)
+        component_cols, col_idx = np.unique(cols[group], return_inverse=True)
+        sub = np.full((len(component_rows), len(component_cols)), forbidden)
+        sub[row_idx, col_idx] = costs[group]
+
+        sub_rows, sub_cols = linear_sum_assignment(sub)
+        allowed = sub[sub_rows, sub_cols] < forbidden
+        matched_rows.append(component_rows[sub_rows[allowed]])
+        matched_cols.append(component_cols[sub_cols[allowed]])
+
+    return np.concatenate(matched_rows), np.concatenate(matched_cols)
+
+
+def gated_assignment(costs, allowed):
+
+    """
+    Minimum cost assignment where pairs outside the gate are never assigned
+    :param costs: numpy array (N, M)
+    :param allowed: numpy bool array (N, M), pairs inside the gate
+    :return: matched rows, matched columns
+    """
+
+    rows, cols = np.nonzero(allowed)
+
+    return sparse_assignment(costs.shape[0], costs.shape[1], rows, cols, costs[rows, cols])
+
+
+def associate(tracked_boxes, detected_boxes, max_distance=None, min_iou=0.0, iou_weight=0.5):
+
+    """
+    Matches tracked boxes to detected boxes in one numpy pass
+    :param tracked_boxes: numpy array (N, 4), left top right bottom
+    :param detected_boxes: numpy array (M, 4), left top right bottom
+    :param max_distance: float, pairs with centers further away are never assigned, None disables the gate
+    :param min_iou: float, pairs with less IoU are never assigned
+    :param iou_weight: float in [0, 1], weight of the IoU term on the cost
+    :return: matched tracked indexes, matched detected indexes
+    """
+
+    distances = center_distance_matrix(box_centers(tracked_boxes), box_centers(detected_boxes))
+    ious = iou_matrix(tracked_boxes, detected_boxes)
+
+    allowed = ious >= min_iou
+    if max_distance is not None:
+        allowed &= distances <= max_distance
+    scale = max_distance if max_distance is not None else max(1.0, distances.max(initial=0))
+
+    costs = cost_matrix(distances, ious, scale, iou_weight)
+
+    return gated_assignment(costs, allowed)
+
+
+def associate_grid(tracked_boxes, detected_boxes, grid, min_iou=0.0, iou_weight=0.5):
+
+    """
+    Sparse version of associate: each track only sees the detections
+    of its neighbouring grid cells, costs are computed for those pairs only
+    :param tracked_boxes: numpy array (N, 4), left top right bottom
+    :param detected_boxes: numpy array (M, 4), left top right bottom
+    :param grid: utils.spatial.GridIndex, its max_distance is the gate
+    :param min_iou: float, pairs with less IoU are never assigned
+    :param iou_weight: float in [0, 1], weight of the IoU term on the cost
+    :return: matched tracked indexes, matched detected indexes
+    """
+
+    tracked_boxes = np.asarray(tracked_boxes, dtype=np.float64).reshape(-1, 4)
+    detected_boxes = np.asarray(detected_boxes, dtype=np.float64).reshape(-1, 4)
+
+    grid.build(box_centers(detected_boxes))
+    rows, cols, distances = grid.query(box_centers(tracked_boxes))
+
+    ious = pairwise_iou(tracked_boxes[rows], detected_boxes[cols])
+    allowed = ious >= min_iou
+    rows, cols = rows[allowed], cols[allowed]
+
+    costs = cost_matrix(distances[allowed], ious[allowed], grid.max_distance, iou_weight)
+
+    return sparse_assignment(len(tracked_boxes), len(detected_boxes), rows, cols, costs)
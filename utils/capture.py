@@ -0,0 +1,204 @@
+import threading
+import time
+from collections import deque
+
+
+class FrameRing:
+
+    """
+    Small bounded ring of timestamped frames
+    When the ring is full the oldest frame is dropped,
+    so the consumer always finds the freshest frames
+    """
+
+    def __init__(self, size=2):
+        self.frames = deque([], maxlen=size)
+        self.lock = threading.Lock()
+        # Number of frames pushed and dropped since start
+        self.pushed = 0
+        self.dropped = 0
+
+    def push(self, timestamp, frame):
+
+        """
+        Adds a frame to the ring, dropping the oldest one if full
+        :param timestamp: float, capture time (time.monotonic)
+        :param frame: numpy array or cuda image
+        """
+
+        with self.lock:
+            if len(self.frames) == self.frames.maxlen:
+                self.dropped += 1
+            self.pushed += 1
+            self.frames.append((self.pushed, timestamp, frame))
+
+    def latest(self):
+
+        """
+        Returns the freshest frame without removing it
+        :return: tuple (sequence number, timestamp, frame) or None if empty
+        """
+
+        with self.lock:
+            if not self.frames:
+                return None
+            return self.frames[-1]
+
+
+class CaptureWorker(threading.Thread):
+
+    """
+    Reads frames from one camera on its own thread
+    and stores them on a FrameRing, so decode latency
+    is not paid by the inference loop
+    """
+
+    def __init__(self, cam, name, cuda=False, ring_size=2, fps=None, new_frame=None):
+
+        """
+        :param cam: cv2 VideoCapture or jetson.utils gstCamera object
+        :param name: str, worker name
+        :param cuda: bool, True if cam is a gstCamera (CaptureRGBA)
+        :param ring_size: int, number of frames kept on the ring
+        :param fps: float, pace reading to this rate (video files), None reads as fast as possible
+        :param new_frame: threading.Event set every time a frame is pushed
+        """
+
+        super().__init__(name=name, daemon=True)
+        self.cam = cam
+        self.cuda = cuda
+        self.ring = FrameRing(ring_size)
+        self.period = 1.0 / fps if fps else 0
+        self.new_frame = new_frame
+        self.running = True
+        self.finished = False
+
+    def read(self):
+
+        """
+        Captures a frame from the camera
+        Timestamp is taken on grab, as close to exposure as we can get
+        :return: tuple (ok, timestamp, frame)
+        """
+
+        if self.cuda:
+            timestamp = time.monotonic()
+            frame, _, _ = self.cam.CaptureRGBA()
+            return True, timestamp, frame
+
+        if not self.cam.grab():
+            return False, None, None
+        timestamp = time.monotonic()
+        ok, frame = self.cam.retrieve()
+        return ok, timestamp, frame
+
+    def run(self):
+        next_time = time.monotonic()
+        while self.running:
+            ok, timestamp, frame = self.read()
+            if not ok:
+                break
+            self.ring.push(timestamp, frame)
+            if self.new_frame is not None:
+                self.new_frame.set()
+
+            # Video files decode faster than real time
+            # keep them at their own frame rate
+            if self.period:
+                next_time += self.period
+                delay = next_time - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+                else:
+                    next_time = time.monotonic()
+
+        self.finished = True
+        if self.new_frame is not None:
+            self.new_frame.set()
+
+    def stop(self):
+        self.running = False
+
+
+class CapturePair:
+
+    """
+    Runs one CaptureWorker per camera and hands out
+    the freshest pair of frames without blocking
+    """
+
+    def __init__(self, crosswalkCam, roadCam, cuda=False, ring_size=2, fps=None):
+        self.new_frame = threading.Event()
+        self.workers = [
+            CaptureWorker(crosswalkCam, 'crosswalk-capture', cuda, ring_size, fps, self.new_frame),
+            CaptureWorker(roadCam, 'road-capture', cuda, ring_size, fps, self.new_frame),
+        ]
+        # Last sequence numbers handed out per camera
+        self.last_seq = [0, 0]
+
+    def start(self):
+        for worker in self.workers:
+            worker.start()
+
+    def stop(self):
+        for worker in self.workers:
+            worker.stop()
+        for worker in self.workers:
+            worker.join(timeout=1)
+
+    @property
+    def finished(self):
+
+        """
+        True when any camera has run out of frames
+        """
+
+        return any(worker.finished for worker in self.workers)
+
+    @property
+    def dropped(self):
+
+        """
+        Number of frames dropped by each ring
+        """
+
+        return [worker.ring.dropped for worker in self.workers]
+
+    def freshest(self):
+
+        """
+        Takes the freshest frame of each camera
+        Never waits on the cameras: returns None when some camera
+        has no frame yet or neither camera has a new frame
+        Once any camera has run out of frames it always returns None
+        (the other camera would keep handing out its last frame)
+        Every frame comes with a flag telling whether it is new, so the
+        camera that did not advance is not processed again
+        :return: tuple ((crosswalk timestamp, crosswalk frame, new), (road timestamp, road frame, new)) or None
+        """
+
+        if self.finished:
+            return None
+
+        self.new_frame.clear()
+        latest = [worker.ring.latest() for worker in self.workers]
+        if None in latest:
+            return None
+
+        sequences = [item[0] for item in latest]
+        if sequences == self.last_seq:
+            return None
+        new = [sequence != last for sequence, last in zip(sequences, self.last_seq)]
+        self.last_seq = sequences
+
+        return tuple((timestamp, frame, fresh) for (_, timestamp, frame), fresh in zip(latest, new))
+
+    def wait(self, timeout=0.01):
+
+        """
+        Sleeps until any worker pushes a frame or timeout expires
+        Used only when freshest() had nothing new to give
+        :param timeout: float, seconds
+        """
+
+        self.new_frame.wait(timeout)
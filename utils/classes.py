@@ -107,4 +107,15 @@ classesDict = [
         "hair",
         "drier",
         "toothbrush"
-]
\ No newline at end of file
+]
+
+# Colors for known classes
+classesColors = {
+        'person': (255, 0, 0),
+        'car': (0, 255, 0),
+        'bicycle': (0, 0, 255),
+        'motorcycle': (255, 255, 0),
+        'bus': (0, 255, 255),
+        'truck': (255, 0, 255),
+        'unknown': (255, 255, 255)
+}
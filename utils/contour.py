@@ -1,7 +1,7 @@
 import cv2
 from os import path
 from numpy import save, load
-from numpy import array
+from numpy import array, concatenate
 import warnings
 
 
@@ -36,6 +36,29 @@ def is_point_in_contour(contour, point):
     return is_point_inside_box
 
 
+def get_contours_roi(contours, width, height, padding=20):
+    
+    """
+    Padded bounding rectangle of a group of contours
+    clipped to the frame
+    :param contours: list of contours, points on frame
+    :param width: int, frame width
+    :param height: int, frame height
+    :param padding: int, pixels added on every side
+    :return: tuple (x, y, w, h)
+    """
+    
+    points = concatenate([array(c).reshape(-1, 2) for c in contours]).astype('int32')
+    x, y, w, h = cv2.boundingRect(points)
+    
+    left = max(0, x - padding)
+    top = max(0, y - padding)
+    right = min(width, x + w + padding)
+    bottom = min(height, y + h + padding)
+    
+    return left, top, right - left, bottom - top
+
+
 def save_contour(contour, name):
     """
     Saves list of points
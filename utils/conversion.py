@@ -0,0 +1,70 @@
+import cv2
+import numpy as np
+
+try:
+    import jetson.utils
+except ImportError:
+    # CPU only install: CPU backends take cv2 frames directly
+    jetson = None
+
+
+class FrameConverter:
+
+    """
+    Converts cv2 frames of one stream to Cuda Mallocs
+    Resize and colour buffers are allocated once and reused
+    with dst= outputs, so steady state conversion allocates nothing
+    """
+
+    def __init__(self, width, height, show=False):
+
+        """
+        :param width: net input width
+        :param height: net input height
+        :param show: bool, return a BGR frame for display
+        """
+
+        self.width = width
+        self.height = height
+        self.show = show
+
+        # BGR buffer for resized frames, only needed when shapes differ
+        self.resized = None
+        # Mapped Cuda Malloc and its numpy view (shared memory)
+        self.cuda_malloc = None
+        self.rgba = None
+
+    def allocate_resized(self):
+        self.resized = np.empty((self.height, self.width, 3), dtype=np.uint8)
+
+    def allocate_cuda(self):
+        self.cuda_malloc = jetson.utils.cudaAllocMapped(width=self.width, height=self.height, format='rgba8')
+        self.rgba = jetson.utils.cudaToNumpy(self.cuda_malloc)
+
+    def convert(self, frame):
+
+        """
+        Converts cv2 frame to Cuda Malloc
+        Resize is skipped if frame already has net input shape
+        :param frame: numpy array, BGR image
+        :return: BGR frame at net size (None if show is off), and cudaMalloc frame
+        """
+
+        height, width = frame.shape[:2]
+        if (width, height) != (self.width, self.height):
+            if self.resized is None:
+                self.allocate_resized()
+            cv2.resize(frame, (self.width, self.height), dst=self.resized)
+            frame = self.resized
+
+        if self.cuda_malloc is None:
+            self.allocate_cuda()
+        # Synchronize system: the net must be done with the buffer before overwriting it
+        jetson.utils.cudaDeviceSynchronize()
+        # write straight into the mapped memory seen by the net
+        cv2.cvtColor(frame, cv2.COLOR_BGR2RGBA, dst=self.rgba)
+
+        # frame is already BGR at net size, no need for a RGBA to BGR round trip
+        display_frame = frame if self.show else None
+
+        return display_frame, self.cuda_malloc
@@ -11,6 +11,9 @@ class ConsoleParams:
     system: str
     fps: float
     warnings: bool = False
+    frozen: bool = False
+    risk: tuple = (0.0, -1, -1)
+    actuators: str = ""
 
 
 def print_console(console, params: ConsoleParams):
@@ -30,7 +33,10 @@ def print_console(console, params: ConsoleParams):
     template = tabulate(
         [
             ["WARNINGS:", warnings],
-            ["FPS:", str(fps)]
+            ["FPS:", str(fps)],
+            ["CAMERAS:", "FROZEN" if params.frozen else "OK"],
+            ["RISK:", "{:.2f} (ped {} / veh {})".format(*params.risk)],
+            ["ACTUATORS:", params.actuators]
         ]
     )
     
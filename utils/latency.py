@@ -0,0 +1,148 @@
+import json
+import time
+from collections import namedtuple, deque
+import numpy as np
+
+
+# Timestamps (time.monotonic) a warning comes from: capture of the frame
+# where it was decided, and capture of the first frame where the
+# pedestrian causing it was seen (None if unknown)
+Origin = namedtuple('Origin', ['capture', 'first_seen'])
+
+# histogram bucket edges in seconds, log spaced from 1 ms to 10 s
+BUCKETS = np.concatenate([[0], np.logspace(-3, 1, 25)])
+
+
+class LatencyHistogram:
+
+    """
+    Latency samples of one stage, bounded
+    """
+
+    def __init__(self, samples=10000):
+        self.samples = deque([], maxlen=samples)
+        self.count = 0
+
+    def record(self, seconds):
+        self.samples.append(seconds)
+        self.count += 1
+
+    def percentiles(self, percentiles=(50, 95, 99)):
+
+        """
+        :return: list of floats, latency percentiles in milliseconds (nan if empty)
+        """
+
+        if not self.samples:
+            return [float('nan')] * len(percentiles)
+        return [float(value) for value in np.percentile(np.array(self.samples) * 1000, percentiles)]
+
+    def histogram(self):
+
+        """
+        :return: list of counts per BUCKETS interval (last one open)
+        """
+
+        counts, _ = np.histogram(np.clip(self.samples, 0, BUCKETS[-1]), BUCKETS)
+        return counts.tolist()
+
+
+class LatencyMonitor:
+
+    """
+    End to end latency of one site, per stage:
+    'decision': capture of a frame -> warning decision on that frame
+    'alert/<driver>': capture of the frame turning warnings on -> driver write acknowledged
+    'reaction/<driver>': capture of the first frame of the pedestrian -> driver write acknowledged
+    Acks come from the actuator workers (see utils.actuators)
+    """
+
+    def __init__(self, site='default', samples=10000):
+        self.site = site
+        self.samples = samples
+        self.stages = {}
+
+    def record(self, stage, seconds):
+        if stage not in self.stages:
+            self.stages[stage] = LatencyHistogram(self.samples)
+        self.stages[stage].record(seconds)
+
+    def decision(self, capture, decided=None):
+
+        """
+        :param capture: float, capture time of the frame
+        :param decided: float, time.monotonic of the decision, now if None
+        """
+
+        self.record('decision', (decided if decided is not None else time.monotonic()) - capture)
+
+    def ack(self, driver, state, origin, acked):
+
+        """
+        Actuator acknowledgement listener
+        :param driver: str, driver name
+        :param state: bool, state written
+        :param origin: Origin or None
+        :param acked: float, time.monotonic when the write returned
+        """
+
+        if not state or origin is None:
+            return
+        self.record('alert/' + driver, acked - origin.capture)
+        if origin.first_seen is not None:
+            self.record('reaction/' + driver, acked - origin.first_seen)
+
+    def summary(self):
+
+        """
+        :return: dict, stage -> count, p50 p95 p99 (ms) and histogram
+        """
+
+        summary = {}
+        for stage, histogram in sorted(self.stages.items()):
+            p50, p95, p99 = histogram.percentiles()
+            summary[stage] = {
+                'count': histogram.count, 'p50_ms': p50, 'p95_ms': p95, 'p99_ms': p99,
+                'buckets_s': BUCKETS.tolist(), 'histogram': histogram.histogram()
+            }
+
+        return summary
+
+    def report(self):
+
+        """
+        :return: str, one line per stage
+        """
+
+        lines = ["latency at site {}".format(self.site)]
+        for stage, stats in self.summary().items():
+            lines.append("{:<20} n={:<6} p50 {:8.1f} ms  p95 {:8.1f} ms  p99 {:8.1f} ms".format(
+                stage, stats['count'], stats['p50_ms'], stats['p95_ms'], stats['p99_ms']
+            ))
+
+        return "\n".join(lines)
+
+    def save(self, path):
+        with open(path, 'w') as file:
+            json.dump({'site': self.site, 'stages': self.summary()}, file, indent=2)
+
+    def check_budget(self, budget, percentile=95):
+
+        """
+        Fails when any stage goes over its budget
+        Stages are matched by prefix, so 'alert' covers every driver
+        :param budget: dict, stage prefix -> seconds
+        :param percentile: int, percentile compared with the budget, 50 95 or 99
+        """
+
+        over = []
+        for stage, histogram in self.stages.items():
+            for prefix, seconds in budget.items():
+                if stage.split('/')[0] != prefix:
+                    continue
+                value = histogram.percentiles((percentile,))[0]
+                if value > seconds * 1000:
+                    over.append("{} p{} {:.1f} ms > {:.1f} ms".format(stage, percentile, value, seconds * 1000))
+
+        if over:
+            raise Exception("Latency over budget at site {}: {}".format(self.site, ", ".join(over)))
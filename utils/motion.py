@@ -0,0 +1,110 @@
+import cv2
+import numpy as np
+
+
+class MotionGate:
+
+    """
+    Cheap motion detector run before the net
+    Frame differencing on a heavily downscaled gray copy,
+    restricted to the zone contours of the camera.
+    Also detects frozen cameras (repeated identical frames)
+    """
+
+    def __init__(self, contours, width, height, scale=0.125, threshold=25, min_pixels=3,
+                 idle_frames=10, frozen_frames=50):
+
+        """
+        :param contours: list of contours (points on full frame) to watch
+        :param width: int, full frame width
+        :param height: int, full frame height
+        :param scale: float, downscale factor applied to frames
+        :param threshold: int, gray level difference counted as motion
+        :param min_pixels: int, changed pixels inside zones needed to count as motion
+        :param idle_frames: int, frames without motion before detection is skipped
+        :param frozen_frames: int, identical frames before the camera is reported frozen
+        """
+
+        self.size = (max(1, int(width * scale)), max(1, int(height * scale)))
+        self.threshold = threshold
+        self.min_pixels = min_pixels
+        self.idle_frames = idle_frames
+        self.frozen_frames = frozen_frames
+
+        # Zones mask on the downscaled frame
+        small_w, small_h = self.size
+        self.mask = np.zeros((small_h, small_w), dtype=np.uint8)
+        for contour in contours:
+            points = np.round(np.asarray(contour, dtype=np.float32) * scale).astype(np.int32)
+            cv2.fillPoly(self.mask, [points], 255)
+        self.zone_pixels = max(1, cv2.countNonZero(self.mask))
+
+        # Preallocated buffers
+        self.small = None
+        self.gray = np.empty((small_h, small_w), dtype=np.uint8)
+        self.prev = None
+        self.diff = np.empty((small_h, small_w), dtype=np.uint8)
+
+        # frames since last motion / since last change
+        self.idle = 0
+        self.still = 0
+        self.motion_fraction = 0.0
+
+    @property
+    def frozen(self):
+
+        """
+        True when the camera keeps sending the very same frame
+        """
+
+        return self.still >= self.frozen_frames
+
+    @property
+    def active(self):
+
+        """
+        True while the net has to run on this camera
+        """
+
+        return self.idle < self.idle_frames and not self.frozen
+
+    def update(self, frame):
+
+        """
+        Feeds a new frame to the gate
+        :param frame: numpy array, BGR image
+        :return: bool, True if the net has to run on this frame
+        """
+
+        if self.small is None:
+            self.small = np.empty((self.size[1], self.size[0], frame.shape[2]), dtype=np.uint8)
+        cv2.resize(frame, self.size, dst=self.small, interpolation=cv2.INTER_AREA)
+        cv2.cvtColor(self.small, cv2.COLOR_BGR2GRAY, dst=self.gray)
+
+        # first frame: nothing to compare with
+        if self.prev is None:
+            self.prev = self.gray.copy()
+            return True
+
+        cv2.absdiff(self.gray, self.prev, dst=self.diff)
+
+        # duplicated frame from a stuck camera
+        if not self.diff.any():
+            self.still += 1
+        else:
+            self.still = 0
+
+        cv2.threshold(self.diff, self.threshold, 255, cv2.THRESH_BINARY, dst=self.diff)
+        cv2.bitwise_and(self.diff, self.mask, dst=self.diff)
+        changed = cv2.countNonZero(self.diff)
+        self.motion_fraction = changed / self.zone_pixels
+
+        if changed >= self.min_pixels:
+            self.idle = 0
+        else:
+            self.idle += 1
+
+        # swap buffers, current frame becomes previous
+        self.prev, self.gray = self.gray, self.prev
+
+        return self.active
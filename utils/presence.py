@@ -0,0 +1,146 @@
+import time
+from utils import contour
+from utils.motion import MotionGate
+
+
+class RoadPresence:
+
+    """
+    Presence-only road analysis
+    Answers "is there a vehicle inside roadContour" without
+    building BBox objects nor tracking them
+    method 'motion': motion occupancy of roadContour on a downscaled frame
+    method 'lowres': detector pass with a small input size over the contour ROI
+    Neither method tells whether the vehicle is approaching:
+    it only reports activity inside the contour
+    """
+
+    def __init__(self, roadContour, width, height, method='motion', net=None, vehicle_ids=(),
+                 occupancy=0.02, roi=None):
+
+        """
+        :param roadContour: contour, points on frame
+        :param width: int, frame width
+        :param height: int, frame height
+        :param method: str, 'motion' or 'lowres'
+        :param net: Detector with a small input size, needed by 'lowres'
+        :param vehicle_ids: list of int, class ids counted as vehicles ('lowres')
+        :param occupancy: float, fraction of the contour in motion counted as presence ('motion')
+        :param roi: tuple (x, y, w, h), region passed to the net ('lowres')
+        """
+
+        if method not in ('motion', 'lowres'):
+            raise Exception("Unknown presence method {}".format(method))
+        if method == 'lowres' and (net is None or net.input_format != 'bgr'):
+            raise Exception("'lowres' presence needs a detector taking cv2 frames")
+
+        self.method = method
+        self.roadContour = roadContour
+        self.net = net
+        self.vehicle_ids = set(vehicle_ids)
+        self.occupancy = occupancy
+        self.roi = roi
+        # every frame counts as motion, no idle frames needed
+        self.gate = MotionGate([roadContour], width, height, idle_frames=1) if method == 'motion' else None
+
+        self.present = False
+
+    def update(self, frame):
+
+        """
+        Estimates vehicle presence on a new frame
+        :param frame: numpy array, BGR image
+        :return: bool, True if a vehicle is inside roadContour
+        """
+
+        if self.method == 'motion':
+            self.gate.update(frame)
+            self.present = self.gate.motion_fraction >= self.occupancy
+
+        else:
+            detections, = self.net.detect_in_rois([frame], ['road'], [self.roi])
+            self.present = any(
+                detection.ClassID in self.vehicle_ids
+                and contour.is_point_in_contour(self.roadContour, detection.Center)
+                for detection in detections
+            )
+
+        return self.present
+
+
+class PresenceAgreement:
+
+    """
+    Compares presence estimates against the full detector path
+    and accumulates timings of both
+    """
+
+    def __init__(self):
+        # [estimate][reference] counts
+        self.counts = {(True, True): 0, (True, False): 0, (False, True): 0, (False, False): 0}
+        self.estimate_time = 0.0
+        self.reference_time = 0.0
+
+    def update(self, estimate, reference, estimate_time=0.0, reference_time=0.0):
+
+        """
+        :param estimate: bool, presence estimator answer
+        :param reference: bool, full detector path answer
+        :param estimate_time: float, seconds spent by the estimator
+        :param reference_time: float, seconds spent by the full path
+        """
+
+        self.counts[(bool(estimate), bool(reference))] += 1
+        self.estimate_time += estimate_time
+        self.reference_time += reference_time
+
+    @property
+    def frames(self):
+        return sum(self.counts.values())
+
+    @property
+    def agreement(self):
+        return (self.counts[(True, True)] + self.counts[(False, False)]) / max(1, self.frames)
+
+    @property
+    def missed(self):
+
+        """
+        Fraction of frames with vehicles the estimator did not see
+        (the dangerous error)
+        """
+
+        positives = self.counts[(True, True)] + self.counts[(False, True)]
+        return self.counts[(False, True)] / max(1, positives)
+
+    @property
+    def false_alarms(self):
+        negatives = self.counts[(True, False)] + self.counts[(False, False)]
+        return self.counts[(True, False)] / max(1, negatives)
+
+    @property
+    def speedup(self):
+        return self.reference_time / max(1e-9, self.estimate_time)
+
+    def summary(self):
+        return (
+            "frames: {} agreement: {:.3f} missed: {:.3f} false alarms: {:.3f} "
+            "estimate: {:.2f} ms/frame full: {:.2f} ms/frame speedup: x{:.1f}"
+        ).format(
+            self.frames, self.agreement, self.missed, self.false_alarms,
+            1000 * self.estimate_time / max(1, self.frames),
+            1000 * self.reference_time / max(1, self.frames),
+            self.speedup
+        )
+
+
+def timed(function, *args):
+
+    """
+    Calls function and measures its duration
+    :return: tuple (result, seconds)
+    """
+
+    start = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - start
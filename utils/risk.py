@@ -0,0 +1,202 @@
+from collections import namedtuple
+import numpy as np
+
+
+# Top risk of a frame and the tracks causing it (-1: no track)
+Risk = namedtuple('Risk', ['score', 'pedestrian', 'vehicle'])
+
+# unit vectors of the image directions (y grows downwards)
+DIRECTIONS = {
+    'up': np.array([0.0, -1.0]),
+    'down': np.array([0.0, 1.0]),
+    'left': np.array([-1.0, 0.0]),
+    'right': np.array([1.0, 0.0]),
+}
+
+
+class RiskEngine:
+
+    """
+    Continuous pedestrian - vehicle risk score
+    Pedestrians score by heading, approach speed and time to reach the
+    crossing from their waiting zone (or from anywhere with a distance
+    field of the crossing: those on it score 1), vehicles by their speed (or time
+    to reach the crossing if its position on the road camera is known),
+    and every pair scores the product of both, computed at once by
+    broadcasting. Works on the numeric arrays of trackers.arraytracker
+    """
+
+    def __init__(self, zones, approaches, horizon=3.0, min_speed=10.0, min_heading=0.1, pedestrian_floor=0.5,
+                 vehicle_speed=50.0, vehicle_floor=0.5, road_crossing=None, field=None, crossing='crossing'):
+
+        """
+        :param zones: utils.zones.ZoneMask of the crosswalk camera
+        :param approaches: dict, zone name -> direction ("up", "down", "left", "right")
+                           pedestrians walk to reach the crossing from that zone
+        :param horizon: float, time to reach the crossing scoring 1 / e (tracker time units)
+        :param min_speed: float, slower approaches score 0 (tracker velocity units)
+        :param min_heading: float, min cosine between velocity and approach direction,
+                            0.1 matches the |dx / dy| < 10 rule of utils.tracking
+        :param pedestrian_floor: float, score of a pedestrian heading into the crossing however
+                                 far or slow, so a heading pedestrian and a vehicle on the road
+                                 (the baseline warning) always score pedestrian_floor * vehicle_floor
+        :param vehicle_speed: float, vehicle speed scoring half way over vehicle_floor
+        :param vehicle_floor: float, score of a vehicle standing on the road
+        :param road_crossing: tuple, crossing point on the road camera, None when unknown
+        :param field: utils.zones.DistanceField of the crosswalk camera, None scores
+                      pedestrians inside the approaches zones only
+        :param crossing: str, zone of field covering the crossing
+        """
+
+        self.horizon = horizon
+        self.min_speed = min_speed
+        self.min_heading = min_heading
+        self.pedestrian_floor = pedestrian_floor
+        self.vehicle_speed = vehicle_speed
+        self.vehicle_floor = vehicle_floor
+        self.road_crossing = None if road_crossing is None else np.asarray(road_crossing, dtype=np.float64)
+        self.field = field
+        self.crossing = crossing
+
+        # per zone: bit, approach direction and crossing edge of the zone
+        # (the furthest zone pixels along the approach direction)
+        self.bits = np.array([zones.bits[name] for name in approaches], dtype=np.uint8)
+        self.directions = np.array([DIRECTIONS[direction] for direction in approaches.values()])
+        ys, xs = np.nonzero(zones.mask)
+        pixels = np.stack([xs, ys], axis=1).astype(np.float64)
+        self.edges = np.zeros(len(approaches))
+        for idx, name in enumerate(approaches):
+            inside = (zones.mask[ys, xs] & zones.bits[name]) != 0
+            self.edges[idx] = (pixels[inside] @ self.directions[idx]).max() if inside.any() else 0
+
+    def pedestrian_scores(self, centers, velocities, known, zone_bits):
+
+        """
+        Risk of every pedestrian, in [0, 1]
+        :param centers: numpy array (N, 2)
+        :param velocities: numpy array (N, 2)
+        :param known: numpy bool array (N,), velocity observed
+        :param zone_bits: numpy uint8 array (N,), zones of every pedestrian
+        :return: numpy array (N,)
+        """
+
+        centers = np.asarray(centers, dtype=np.float64).reshape(-1, 2)
+        velocities = np.asarray(velocities, dtype=np.float64).reshape(-1, 2)
+
+        if self.field is not None:
+            return self.field_scores(centers, velocities, known)
+
+        # (N, zones) approach speed, heading and distance to the crossing edge
+        approach = velocities @ self.directions.T
+        speed = np.linalg.norm(velocities, axis=1)[:, None]
+        heading = np.divide(approach, speed, out=np.zeros_like(approach), where=speed > 0)
+        distance = np.clip(self.edges[None, :] - centers @ self.directions.T, 0, None)
+        time = np.divide(distance, approach, out=np.full_like(distance, np.inf), where=approach > 0)
+
+        inside = (zone_bits[:, None] & self.bits[None, :]) != 0
+        moving = inside & known[:, None] & (approach >= self.min_speed) & (heading >= self.min_heading)
+        scores = np.where(moving, self.heading_scores(heading, time), 0)
+
+        return scores.max(axis=1, initial=0)
+
+    def heading_scores(self, heading, time):
+
+        """
+        Score of pedestrians heading into the crossing, in [pedestrian_floor, 1]
+        :param heading: numpy array, cosine between velocity and approach direction
+        :param time: numpy array, time to reach the crossing
+        """
+
+        return self.pedestrian_floor + (1 - self.pedestrian_floor) * heading * np.exp(-time / self.horizon)
+
+    def field_scores(self, centers, velocities, known):
+
+        """
+        Pedestrian risk from the distance field of the crossing,
+        time to enter it is looked up wherever the pedestrian is
+        """
+
+        times, approach = self.field.time_to_enter(centers, velocities, self.crossing)
+        speed = np.linalg.norm(velocities, axis=1)
+        heading = np.divide(approach, speed, out=np.zeros_like(approach), where=speed > 0)
+
+        moving = known & (approach >= self.min_speed) & (heading >= self.min_heading)
+        scores = np.where(moving, self.heading_scores(heading, times), 0)
+
+        # pedestrians already on the crossing
+        scores[times == 0] = 1.0
+
+        return scores
+
+    def vehicle_scores(self, centers, velocities):
+
+        """
+        Risk of every vehicle on the road, in [vehicle_floor, 1]
+        :param centers: numpy array (M, 2)
+        :param velocities: numpy array (M, 2)
+        :return: numpy array (M,)
+        """
+
+        centers = np.asarray(centers, dtype=np.float64).reshape(-1, 2)
+        velocities = np.asarray(velocities, dtype=np.float64).reshape(-1, 2)
+
+        if self.road_crossing is None:
+            speed = np.linalg.norm(velocities, axis=1)
+            closeness = speed / (speed + self.vehicle_speed)
+        else:
+            offset = self.road_crossing[None, :] - centers
+            distance = np.linalg.norm(offset, axis=1)
+            approach = np.einsum('ij,ij->i', velocities, offset) / np.maximum(distance, 1)
+            time = np.divide(distance, approach, out=np.full_like(distance, np.inf), where=approach > 0)
+            closeness = np.exp(-time / self.horizon)
+
+        return self.vehicle_floor + (1 - self.vehicle_floor) * closeness
+
+    def pairs(self, pedestrian_ids, pedestrian_scores, vehicle_ids, vehicle_scores):
+
+        """
+        Scores every pedestrian - vehicle pair at once
+        :return: Risk, top pair (score 0 when no pair)
+        """
+
+        if len(pedestrian_ids) == 0 or len(vehicle_ids) == 0:
+            return Risk(0.0, -1, -1)
+
+        matrix = pedestrian_scores[:, None] * vehicle_scores[None, :]
+        row, col = np.unravel_index(np.argmax(matrix), matrix.shape)
+        if matrix[row, col] <= 0:
+            return Risk(0.0, -1, -1)
+
+        return Risk(float(matrix[row, col]), int(pedestrian_ids[row]), int(vehicle_ids[col]))
+
+    def assess(self, pedestrians, vehicles=None, vehicle_present=False):
+
+        """
+        Top risk between the tracks of both cameras
+        Only tracks matched on the last update of their camera are scored,
+        tracks gone missing are kept by the trackers but are not on the scene
+        :param pedestrians: trackers.zonetracker.ZoneTracker of the crosswalk camera
+        :param vehicles: trackers.arraytracker.ArrayTracker of the road camera,
+                         None when only presence is known (road presence mode)
+        :param vehicle_present: bool, used when vehicles is None
+        :return: Risk
+        """
+
+        slots = pedestrians.fresh
+        pedestrian_scores = self.pedestrian_scores(
+            pedestrians.centers[slots],
+            pedestrians.velocities[slots],
+            pedestrians.has_velocity[slots],
+            pedestrians.zone_bits[slots]
+        )
+
+        if vehicles is None:
+            # a single standing vehicle of unknown ID
+            vehicle_ids = np.array([-1]) if vehicle_present else np.empty(0, dtype=np.int64)
+            vehicle_scores = np.full(len(vehicle_ids), self.vehicle_floor)
+        else:
+            vehicle_slots = vehicles.fresh
+            vehicle_ids = vehicles.ids[vehicle_slots]
+            vehicle_scores = self.vehicle_scores(vehicles.centers[vehicle_slots], vehicles.velocities[vehicle_slots])
+
+        return self.pairs(pedestrians.ids[slots], pedestrian_scores, vehicle_ids, vehicle_scores)
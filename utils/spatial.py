@@ -0,0 +1,88 @@
+import numpy as np
+
+
+class GridIndex:
+
+    """
+    Uniform grid spatial index over a frame
+    Cells are as big as the expected per-frame displacement,
+    so every point within max_distance of a query lies on the
+    3 x 3 cells around it: candidates come in constant time per query
+    """
+
+    def __init__(self, width, height, max_distance):
+
+        """
+        :param width: int, frame width
+        :param height: int, frame height
+        :param max_distance: float, expected max displacement between frames (pixels)
+        """
+
+        self.max_distance = float(max_distance)
+        self.cell = max(1.0, self.max_distance)
+        self.cols = int(np.ceil(width / self.cell)) + 1
+        self.rows = int(np.ceil(height / self.cell)) + 1
+
+        self.points = np.empty((0, 2))
+        self.order = np.empty(0, dtype=np.intp)
+        self.starts = np.zeros(self.cols * self.rows + 1, dtype=np.intp)
+
+    def cells_of(self, points):
+
+        """
+        :param points: numpy array (N, 2)
+        :return: cell column and row of every point, clipped to the grid
+        """
+
+        cx = np.clip((points[:, 0] // self.cell).astype(np.intp), 0, self.cols - 1)
+        cy = np.clip((points[:, 1] // self.cell).astype(np.intp), 0, self.rows - 1)
+
+        return cx, cy
+
+    def build(self, points):
+
+        """
+        Indexes a batch of points (counting sort by cell)
+        :param points: numpy array (N, 2)
+        """
+
+        self.points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        cx, cy = self.cells_of(self.points)
+        cells = cy * self.cols + cx
+
+        self.order = np.argsort(cells, kind='stable')
+        # points of cell c are order[starts[c]:starts[c + 1]]
+        self.starts = np.searchsorted(cells[self.order], np.arange(self.cols * self.rows + 1))
+
+    def query(self, queries):
+
+        """
+        Indexed points within max_distance of every query point
+        :param queries: numpy array (Q, 2)
+        :return: query indexes, point indexes and distances of every candidate pair
+        """
+
+        queries = np.asarray(queries, dtype=np.float64).reshape(-1, 2)
+        qx, qy = self.cells_of(queries)
+
+        # 3 x 3 neighbour cells of every query: (Q, 9)
+        offsets = np.array([-1, 0, 1])
+        nx = (qx[:, None, None] + offsets[None, None, :]).repeat(3, axis=1).reshape(len(queries), 9)
+        ny = (qy[:, None, None] + offsets[None, :, None]).repeat(3, axis=2).reshape(len(queries), 9)
+        valid = (nx >= 0) & (nx < self.cols) & (ny >= 0) & (ny < self.rows)
+        cells = np.where(valid, ny * self.cols + nx, 0)
+
+        starts = np.where(valid, self.starts[cells], 0).ravel()
+        counts = np.where(valid, self.starts[cells + 1] - self.starts[cells], 0).ravel()
+
+        # expand every (query, cell) into its points without python loops
+        total = counts.sum()
+        rows = np.repeat(np.repeat(np.arange(len(queries)), 9), counts)
+        first = np.repeat(starts, counts)
+        offset = np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts)
+        cols = self.order[first + offset]
+
+        distances = np.sqrt(((queries[rows] - self.points[cols]) ** 2).sum(axis=1))
+        close = distances <= self.max_distance
+
+        return rows[close], cols[close], distances[close]
@@ -1,53 +1,93 @@
+import numpy as np
 from utils.contour import is_point_in_contour
-from scipy.optimize import linear_sum_assignment
-from scipy.spatial import distance
-from numpy import ndarray
+from utils.association import associate, associate_grid, iou_matrix
 
 
-def is_any_pedestrian_crossing(pedestrians, crossContourUp, crossContourDown):
+def is_any_pedestrian_crossing(pedestrians, crossContourUp, crossContourDown, zones=None, min_speed=0.0):
     
     """
     check if any pedestrian bbox is about to cross
     :param pedestrians: list of bboxssd objects
     :param crossContourUp: other side of crosswalk contour
     :param crossContourDown: this side of crosswalk contour
+    :param zones: utils.zones.ZoneMask with 'crossContourUp' and 'crossContourDown' zones,
+                  if given contours are looked up on the mask instead of tested
+    :param min_speed: float, min speed towards the crossing, same units as bbox dx/dy
     :return: bool, True if ped is crossing / False if not
     """
     
+    if zones is not None:
+        pedestrians = list(pedestrians)
+        if not pedestrians:
+            return False
+        centers = [ped.center for ped in pedestrians]
+        in_up = zones.in_zone(centers, 'crossContourUp')
+        in_down = zones.in_zone(centers, 'crossContourDown')
+        for ped, is_up, is_down in zip(pedestrians, in_up, in_down):
+            if is_up and is_bbox_moving_in_direction(ped, 'down', min_speed):
+                return True
+            if is_down and is_bbox_moving_in_direction(ped, 'up', min_speed):
+                return True
+        return False
+    
     for ped in pedestrians:
         is_bbox_in_contour_up = is_point_in_contour(crossContourUp, ped.center)
-        is_ped_moving_down = is_bbox_moving_in_direction(ped, 'down')
+        is_ped_moving_down = is_bbox_moving_in_direction(ped, 'down', min_speed)
         if is_bbox_in_contour_up and is_ped_moving_down:
             return True
         is_bbox_in_contour_down = is_point_in_contour(crossContourDown, ped.center)
-        is_ped_moving_up = is_bbox_moving_in_direction(ped, 'up')
+        is_ped_moving_up = is_bbox_moving_in_direction(ped, 'up', min_speed)
         if is_bbox_in_contour_down and is_ped_moving_up:
             return True
     
     return False
 
 
-def is_bbox_moving_in_direction(bbox, direction):
+def speed_in_direction(bbox, direction):
+    
+    """
+    bbox velocity component along direction
+    :param bbox: bboxssd object or tracker view
+    :param direction: str, "up", "down, "left" or "right"
+    :return: float, positive when moving towards direction,
+             pixels per second on timestamped trackers
+    """
+    
+    if direction == 'up':
+        return -bbox.dy
+    if direction == 'down':
+        return bbox.dy
+    if direction == 'left':
+        return -bbox.dx
+    return bbox.dx
+
+
+def is_bbox_moving_in_direction(bbox, direction, min_speed=0.0):
     
     """
     check bbox direction
     :param bbox: bboxssd object
     :param direction: str, "up", "down, "left" or "right"
+    :param min_speed: float, slower bboxes are not moving in any direction
     :return: bool, True if bbox is moving in direction / false if not
     """
     
-    if direction in bbox.mov:
+    if direction in bbox.mov and speed_in_direction(bbox, direction) >= min_speed:
         return True
     
     return False
 
 
-def is_any_bbox_moving_in_direction(bboxes, direction):
+def is_any_bbox_moving_in_direction(bboxes, direction, min_speed=0.0, max_ratio=10):
     """
     Checks if any bbox direction matches desired direction
     Filters fast objects by applying speed coefficient
+    Both checks work on velocities, so with timestamped trackers
+    (pixels per second) they do not depend on the frame rate
     :param bboxes: list of bounding boxes
     :param direction: str, "up", "down, "left" or "right"
+    :param min_speed: float, min speed along direction, same units as bbox dx/dy
+    :param max_ratio: float, max horizontal / vertical speed ratio
     :return: bool
     """
     for bbox in bboxes:
@@ -57,12 +97,41 @@ def is_any_bbox_moving_in_direction(bboxes, direction):
         # Thus help avoiding fake positives
         coef = 0
         if bbox.dy != 0: coef = abs(bbox.dx / bbox.dy)
-        if coef < 10 and direction in bbox.mov:
+        if coef < max_ratio and is_bbox_moving_in_direction(bbox, direction, min_speed):
             return True
     
     return False
 
 
+def are_moving_in_direction(velocities, direction, min_speed=0.0, max_ratio=10):
+    
+    """
+    Vectorized is_any_bbox_moving_in_direction, one result per velocity
+    :param velocities: numpy array (N, 2), dx dy of every track
+    :param direction: str, "up", "down, "left" or "right"
+    :param min_speed: float, min speed along direction, same units as velocities
+    :param max_ratio: float, max horizontal / vertical speed ratio
+    :return: numpy bool array (N,)
+    """
+    
+    velocities = np.asarray(velocities, dtype=np.float64).reshape(-1, 2)
+    dx, dy = velocities[:, 0], velocities[:, 1]
+    
+    # same rules as bbox.mov: zero speed counts as right / down
+    if direction == 'up':
+        moving = (dy < 0) & (-dy >= min_speed)
+    elif direction == 'down':
+        moving = (dy >= 0) & (dy >= min_speed)
+    elif direction == 'left':
+        moving = (dx < 0) & (-dx >= min_speed)
+    else:
+        moving = (dx >= 0) & (dx >= min_speed)
+    
+    coef = np.divide(np.abs(dx), np.abs(dy), out=np.zeros_like(dx), where=dy != 0)
+    
+    return moving & (coef < max_ratio)
+
+
 def is_any_item_moving(items):
     
     """
@@ -82,63 +151,49 @@ def bb_intersection_over_union(boxA, boxB):
     
     """
     measures the area shared by boxA and boxB
-    :param boxA: list of two points
-    :param boxB: list of two points
+    :param boxA: list, left top right bottom
+    :param boxB: list, left top right bottom
     :return: float, percentage of common area
     """
     
-    # determine the (x, y)-coordinates of the intersection rectangle
-    xa = max(boxA.tl_corner.x, boxB.tl_corner.x)
-    ya = max(boxA.tl_corner.y, boxB.tl_corner.y)
-    xb = min(boxA.br_corner.x, boxB.br_corner.x)
-    yb = min(boxA.br_corner.y, boxB.br_corner.y)
-    
-    # compute the area of intersection rectangle
-    interArea = max(0, xb - xa + 1) * max(0, yb - ya + 1)
-    
-    # compute the area of both the prediction and ground-truth
-    # rectangles
-    boxAArea = (boxA[2] - boxA[0] + 1) * (boxA[3] - boxA[1] + 1)
-    boxBArea = (boxB[2] - boxB[0] + 1) * (boxB[3] - boxB[1] + 1)
+    return float(iou_matrix([boxA], [boxB])[0, 0])
+
+
+def bbox_to_ltrb(bbox):
     
-    # compute the intersection over union by taking the intersection
-    # area and dividing it by the sum of prediction + ground-truth
-    # areas - the interesection area
-    iou = interArea / float(boxAArea + boxBArea - interArea)
+    """
+    :param bbox: bboxssd object
+    :return: tuple, left top right bottom
+    """
     
-    # return the intersection over union value
-    return iou
+    return bbox.start_point + bbox.end_point
 
 
-def calculate_intersection_matrix(detected_bboxes, tracked_bboxes):
+def calculate_intersection_matrix(detected_bboxes, tracked_bboxes, max_distance=None, min_iou=0.0, grid=None):
     """
-    calculates a matrix with all the percentage of intersections between bboxes
+    matches tracked bboxes to detected bboxes
+    cost matrices are built in one numpy pass and pairs outside
+    the max distance / min IoU gate are never assigned
     :param detected_bboxes: new bounding boxes
     :param tracked_bboxes: already tracked bounding boxes
-    :return: matrix with percentage of intersections between bounding boxes
-    """
-    iou_matrix = ndarray(shape=(len(tracked_bboxes), len(detected_bboxes)))
-
-    for t, trk in enumerate(tracked_bboxes):
-        # t: index: 0,1,2,3....
-        # trk: value: [x1, y1, x2, y2]
-        trk_center = trk.get_center()
-        
-        for d, det in enumerate(detected_bboxes):
-            # d: index: 0,1,2....
-            # det: value: [x1, y1, x2, y2]
-            
-            # calculate the intersection percentage [0,1]
-            det_center = det.get_center()
-            dist = distance.euclidean(trk_center, det_center)
-            iou_matrix[t][d] = dist
-
+    :param max_distance: float, max center distance of a match, None for no limit
+    :param min_iou: float, min intersection over union of a match
+    :param grid: utils.spatial.GridIndex, if given only neighbouring pairs are compared
+    :return: (array tracked indexes, array detected indexes)
+    """
+    
+    tracked_boxes = [bbox_to_ltrb(bbox) for bbox in tracked_bboxes]
+    detected_boxes = [bbox_to_ltrb(bbox) for bbox in detected_bboxes]
+    
     # hungarian matrix example
     # hungarian_matrix = (array tracked objects ([0, 1]), array detected objects ([2, 3]))
     # tracked bbox 0 corresponds to detected bbox 2 and
     # tracked bbox 1 corresponds to detected bbox 3
-    hungarian_matrix = linear_sum_assignment(iou_matrix)
-
+    if grid is not None:
+        hungarian_matrix = associate_grid(tracked_boxes, detected_boxes, grid, min_iou)
+    else:
+        hungarian_matrix = associate(tracked_boxes, detected_boxes, max_distance, min_iou)
+    
     return hungarian_matrix
 
 
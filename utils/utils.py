@@ -1,8 +1,6 @@
-import jetson.utils
 import platform
 import cv2
 import numpy as np
-from imageai.Detection import ObjectDetection
 
 
 def is_jetson_platform():
@@ -15,27 +13,6 @@ def is_jetson_platform():
     return platform.processor() != "x86_64"
 
 
-def frameToCuda(frame, width, height):
-    
-    """
-    Converts cv2 frame to Cuda Malloc
-    Resize is neccesary just if video input has different
-    shape than camera input
-    
-    :param frame: numpy array, image
-    :param width: cam width
-    :param height: cam height
-    :return: numpy array frame, and cudaMalloc frame
-    """
-    
-    fr = cv2.resize(frame, (width, height))
-    fr = cv2.cvtColor(fr, cv2.COLOR_BGR2RGBA)
-    cuda_malloc = jetson.utils.cudaFromNumpy(fr)
-    fr = cv2.cvtColor(fr, cv2.COLOR_RGBA2BGR)
-    
-    return fr, cuda_malloc
-
-
 def draw_boxes(image, bboxes, font=cv2.FONT_HERSHEY_SIMPLEX, font_scale=1, color=(255, 0, 0),
                thickness=2):
     
@@ -71,22 +48,6 @@ def draw_boxes(image, bboxes, font=cv2.FONT_HERSHEY_SIMPLEX, font_scale=1, color
     return image
 
 
-def set_detector():
-    """
-    Sets imageAI detector with tinyyoloweigths
-    :return: iamgeAI detector object
-    """
-    print("creating detector...")
-    detect = ObjectDetection()
-    detect.setModelTypeAsTinyYOLOv3()
-    detect.setModelPath("yolo-tiny.h5")
-    print("loading model")
-    detect.loadModel()
-    
-    print("initializing")
-    return detect
-
-
 def get_frames_and_concatenate(c0, c1):
     """
     takes two frames and stack them along x axis
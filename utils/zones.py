@@ -0,0 +1,282 @@
+import cv2
+import hashlib
+import numpy as np
+from os import path
+
+
+class ZoneMask:
+
+    """
+    Rasterized zone membership lookup table of one camera
+    uint8 label mask at frame resolution, one bit per zone,
+    so membership of a batch of points is a single fancy-index lookup
+    """
+
+    def __init__(self, names, mask):
+
+        """
+        :param names: list of str, zone names, zone i is bit 1 << i
+        :param mask: numpy uint8 array (height, width)
+        """
+
+        if len(names) > 8:
+            raise Exception("A uint8 mask holds 8 zones at most, got {}".format(len(names)))
+
+        self.names = list(names)
+        self.bits = {name: 1 << idx for idx, name in enumerate(names)}
+        self.mask = mask
+        self.height, self.width = mask.shape
+
+    @classmethod
+    def from_contours(cls, names, contours, width, height):
+
+        """
+        Rasterizes contours into a label mask
+        :param names: list of str, zone names
+        :param contours: list of contours, points on frame
+        :param width: int, frame width
+        :param height: int, frame height
+        :return: ZoneMask
+        """
+
+        mask = np.zeros((height, width), dtype=np.uint8)
+        layer = np.empty_like(mask)
+        for idx, contour in enumerate(contours):
+            layer.fill(0)
+            cv2.fillPoly(layer, [np.asarray(contour, dtype=np.int32).reshape(-1, 2)], 1 << idx)
+            mask |= layer
+
+        return cls(names, mask)
+
+    def labels(self, points):
+
+        """
+        Zone bits of every point
+        :param points: numpy array (N, 2), coordinates on frame
+        :return: numpy uint8 array (N,), bitwise OR of the zones containing each point
+        """
+
+        points = np.asarray(points).reshape(-1, 2)
+        # points out of frame are in no zone
+        x = np.round(points[:, 0]).astype(np.intp)
+        y = np.round(points[:, 1]).astype(np.intp)
+        inside = (x >= 0) & (x < self.width) & (y >= 0) & (y < self.height)
+
+        labels = np.zeros(len(points), dtype=np.uint8)
+        labels[inside] = self.mask[y[inside], x[inside]]
+
+        return labels
+
+    def in_zone(self, points, name):
+
+        """
+        Membership of a batch of points to one zone
+        :param points: numpy array (N, 2), coordinates on frame
+        :param name: str, zone name
+        :return: numpy bool array (N,)
+        """
+
+        return (self.labels(points) & self.bits[name]) != 0
+
+    def is_point_in_zone(self, point, name):
+
+        """
+        Single point version of in_zone
+        :param point: tuple, coordinates
+        :param name: str, zone name
+        :return: bool
+        """
+
+        x, y = int(round(point[0])), int(round(point[1]))
+        if not (0 <= x < self.width and 0 <= y < self.height):
+            return False
+
+        return bool(self.mask[y, x] & self.bits[name])
+
+
+def contours_digest(contours, width, height):
+
+    """
+    Fingerprint of the contours a mask was built from
+    :return: str, hex digest
+    """
+
+    digest = hashlib.sha1()
+    digest.update(np.array([width, height], dtype=np.int64).tobytes())
+    for contour in contours:
+        digest.update(np.ascontiguousarray(contour, dtype=np.int64).tobytes())
+
+    return digest.hexdigest()
+
+
+def load_zone_mask(name, names, contours, width, height):
+
+    """
+    Loads the zone mask cached next to the contours in resources/
+    Rebuilds and saves it when missing or when any contour changed
+    :param name: str, mask file name, e.g. 'crosswalkZones'
+    :param names: list of str, zone names
+    :param contours: list of contours, points on frame
+    :param width: int, frame width
+    :param height: int, frame height
+    :return: ZoneMask
+    """
+
+    folder = 'resources'
+    mask_path = path.join(folder, name + '.npz')
+    digest = contours_digest(contours, width, height)
+
+    if path.isfile(mask_path):
+        cached = np.load(mask_path)
+        if str(cached['digest']) == digest and list(cached['names']) == list(names):
+            return ZoneMask(names, cached['mask'])
+
+    zones = ZoneMask.from_contours(names, contours, width, height)
+    np.savez_compressed(mask_path, mask=zones.mask, names=np.array(names), digest=np.array(digest))
+    print("Zone mask guardada!")
+
+    return zones
+
+
+def between_contours(contours, width, height):
+
+    """
+    Contour of the region between zones, e.g. the crossing between
+    both waiting zones of a crosswalk: convex hull of the contours
+    minus the zones themselves, largest remaining region
+    :param contours: list of contours, points on frame
+    :param width: int, frame width
+    :param height: int, frame height
+    :return: numpy int32 array (N, 2), empty if zones leave no gap
+    """
+
+    points = np.concatenate([np.asarray(contour, dtype=np.int32).reshape(-1, 2) for contour in contours])
+    region = np.zeros((height, width), dtype=np.uint8)
+    cv2.fillPoly(region, [cv2.convexHull(points).reshape(-1, 2)], 1)
+    for contour in contours:
+        cv2.fillPoly(region, [np.asarray(contour, dtype=np.int32).reshape(-1, 2)], 0)
+
+    found = cv2.findContours(region, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)[-2]
+    if not found:
+        return np.empty((0, 2), dtype=np.int32)
+
+    return max(found, key=cv2.contourArea).reshape(-1, 2)
+
+
+class DistanceField:
+
+    """
+    Signed distance field of every zone of a ZoneMask and its gradient
+    Distance to the zone border in pixels, positive outside and negative
+    inside, gradient unit vectors point away from the zone, so distance
+    and time to enter a zone are a lookup for any batch of points
+    Stored as float16 to keep (zones, height, width) rasters small
+    """
+
+    def __init__(self, names, distances, gradients):
+
+        """
+        :param names: list of str, zone names
+        :param distances: numpy float16 array (zones, height, width)
+        :param gradients: numpy float16 array (zones, height, width, 2), dx dy
+        """
+
+        self.names = list(names)
+        self.index = {name: idx for idx, name in enumerate(names)}
+        self.distances = distances
+        self.gradients = gradients
+        self.height, self.width = distances.shape[1:]
+
+    @classmethod
+    def from_zones(cls, zones):
+
+        """
+        Distance transforms of the rasterized zones
+        :param zones: ZoneMask
+        :return: DistanceField
+        """
+
+        distances = np.empty((len(zones.names), zones.height, zones.width), dtype=np.float16)
+        gradients = np.empty(distances.shape + (2,), dtype=np.float16)
+        for idx, name in enumerate(zones.names):
+            inside = ((zones.mask & zones.bits[name]) != 0).astype(np.uint8)
+            outside_distance = cv2.distanceTransform(1 - inside, cv2.DIST_L2, 5)
+            inside_distance = cv2.distanceTransform(inside, cv2.DIST_L2, 5)
+            field = outside_distance - inside_distance
+
+            gy, gx = np.gradient(field)
+            norm = np.hypot(gx, gy)
+            norm[norm == 0] = 1
+
+            distances[idx] = field
+            gradients[idx, :, :, 0] = gx / norm
+            gradients[idx, :, :, 1] = gy / norm
+
+        return cls(zones.names, distances, gradients)
+
+    def lookup(self, points, name):
+
+        """
+        Signed distance and gradient at every point
+        Points out of frame take the value of the closest border pixel
+        :param points: numpy array (N, 2), coordinates on frame
+        :param name: str, zone name
+        :return: numpy array (N,) distances, numpy array (N, 2) gradients
+        """
+
+        points = np.asarray(points).reshape(-1, 2)
+        x = np.clip(np.round(points[:, 0]).astype(np.intp), 0, self.width - 1)
+        y = np.clip(np.round(points[:, 1]).astype(np.intp), 0, self.height - 1)
+        idx = self.index[name]
+
+        return self.distances[idx, y, x].astype(np.float64), self.gradients[idx, y, x].astype(np.float64)
+
+    def time_to_enter(self, points, velocities, name):
+
+        """
+        Time for every point to reach a zone at its current velocity
+        :param points: numpy array (N, 2), coordinates on frame
+        :param velocities: numpy array (N, 2), same time units as the result
+        :param name: str, zone name
+        :return: numpy array (N,) times (0 inside, inf if not approaching),
+                 numpy array (N,) approach speeds towards the zone
+        """
+
+        distances, gradients = self.lookup(points, name)
+        velocities = np.asarray(velocities, dtype=np.float64).reshape(-1, 2)
+        approach = -np.einsum('ij,ij->i', velocities, gradients)
+
+        times = np.divide(distances, approach, out=np.full_like(distances, np.inf), where=approach > 0)
+        times[distances <= 0] = 0
+
+        return times, approach
+
+
+def load_distance_field(name, zones, contours):
+
+    """
+    Loads the distance field cached next to the contours in resources/
+    Rebuilds and saves it when missing or when any contour changed
+    :param name: str, field file name, e.g. 'crosswalkField'
+    :param zones: ZoneMask rasterized from contours
+    :param contours: list of contours the zones come from
+    :return: DistanceField
+    """
+
+    folder = 'resources'
+    field_path = path.join(folder, name + '.npz')
+    digest = contours_digest(contours, zones.width, zones.height)
+
+    if path.isfile(field_path):
+        cached = np.load(field_path)
+        if str(cached['digest']) == digest and list(cached['names']) == zones.names:
+            return DistanceField(zones.names, cached['distances'], cached['gradients'])
+
+    field = DistanceField.from_zones(zones)
+    np.savez(
+        field_path, distances=field.distances, gradients=field.gradients,
+        names=np.array(zones.names), digest=np.array(digest)
+    )
+    print("Distance field guardado!")
+
+    return field